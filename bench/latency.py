@@ -0,0 +1,147 @@
+"""
+Request latency benchmark comparing server launch profiles.
+
+Starts the provider once per profile on a local port, sends a fixed sequence of feed value requests
+and prints latency percentiles. Run from the repository root:
+
+    python bench/latency.py --profiles default,production,production+thread --requests 5000 --concurrency 32
+
+The fixed value provider is used by default so runs do not depend on exchange connectivity; use
+--impl synthetic to include simulated ingestion load, or --impl ccxt for live exchanges. Profiles
+with an ingestion thread need a provider that ingests, so they default to --impl synthetic and
+reject fixed and random.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+import aiohttp
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROFILES = {
+    "default": {"SERVER_PROFILE": "default"},
+    "production": {"SERVER_PROFILE": "production"},
+    "production+thread": {"SERVER_PROFILE": "production", "INGESTION_THREAD": "true"},
+}
+# Providers that run ingestion, the only ones an ingestion thread makes a difference for
+INGESTING_IMPLS = ("synthetic", "ccxt")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def feed_request(feed_count: int) -> dict:
+    with open(ROOT / "src" / "config" / "feeds.json") as f:
+        config = json.load(f)
+    feeds = config["feeds"] if isinstance(config, dict) else config
+    return {"feeds": [item["feed"] for item in feeds[:feed_count]]}
+
+
+async def wait_ready(session: aiohttp.ClientSession, url: str, timeout_sec: float):
+    deadline = time.monotonic() + timeout_sec
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{url}/docs") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"Server at {url} did not become ready")
+
+
+async def run_load(url: str, body: dict, requests: int, concurrency: int, warmup: int) -> tuple:
+    latencies = []
+    counter = iter(range(warmup + requests))
+
+    async with aiohttp.ClientSession() as session:
+        await wait_ready(session, url, 60)
+
+        async def worker():
+            for i in counter:
+                start = time.perf_counter()
+                async with session.post(f"{url}/feed-values/{i}", json=body) as response:
+                    await response.read()
+                if i >= warmup:
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def bench_profile(name: str, args) -> dict:
+    port = free_port()
+    env = {**os.environ, **PROFILES[name], "VALUE_PROVIDER_IMPL": args.impl, "VALUE_PROVIDER_CLIENT_PORT": str(port)}
+    server = subprocess.Popen(
+        [sys.executable, "src/main.py"], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        latencies, elapsed = asyncio.run(
+            run_load(f"http://127.0.0.1:{port}", feed_request(args.feeds), args.requests, args.concurrency, args.warmup)
+        )
+    finally:
+        server.terminate()
+        server.wait(10)
+
+    return {
+        "profile": name,
+        "rps": round(len(latencies) / elapsed),
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies),
+        "mean": statistics.fmean(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", default="default,production")
+    parser.add_argument(
+        "--impl", choices=["fixed", "random", "synthetic", "ccxt"], help="fixed, or synthetic with ingestion thread profiles"
+    )
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--feeds", type=int, default=50, help="Number of feeds per request")
+    args = parser.parse_args()
+
+    profiles = [name.strip() for name in args.profiles.split(",")]
+    unknown = [name for name in profiles if name not in PROFILES]
+    if unknown:
+        parser.error(f"unknown profiles {unknown}, expected some of {list(PROFILES)}")
+    threaded = [name for name in profiles if PROFILES[name].get("INGESTION_THREAD") == "true"]
+    if args.impl is None:
+        args.impl = "synthetic" if threaded else "fixed"
+    elif threaded and args.impl not in INGESTING_IMPLS:
+        parser.error(f"profiles {threaded} need a provider running ingestion, use --impl {' or '.join(INGESTING_IMPLS)}")
+    print(f"Provider: {args.impl}")
+
+    print(f"{'profile':<20}{'rps':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'mean ms':>10}")
+    for name in profiles:
+        r = bench_profile(name, args)
+        print(
+            f"{r['profile']:<20}{r['rps']:>8}{r['p50']:>10.2f}{r['p90']:>10.2f}"
+            f"{r['p99']:>10.2f}{r['max']:>10.2f}{r['mean']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
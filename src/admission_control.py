@@ -0,0 +1,183 @@
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import re
+from typing import Dict, List, Tuple
+from loguru import logger
+
+# Disabled by default, enable to prioritize voting round requests and shed other routes under load
+ADMISSION_CONTROL = os.environ.get("ADMISSION_CONTROL", "false").lower() == "true"
+# Requests handled at once across all routes, further requests wait in a priority queue
+ADMISSION_MAX_CONCURRENCY = int(os.environ.get("ADMISSION_MAX_CONCURRENCY", 64))
+ADMISSION_CURRENT_CONCURRENCY = int(os.environ.get("ADMISSION_CURRENT_CONCURRENCY", 32))
+ADMISSION_VOLUMES_CONCURRENCY = int(os.environ.get("ADMISSION_VOLUMES_CONCURRENCY", 4))
+ADMISSION_OTHER_CONCURRENCY = int(os.environ.get("ADMISSION_OTHER_CONCURRENCY", 4))
+# Queued requests per sheddable route, and how long they may wait, before being rejected with 503
+ADMISSION_QUEUE_SIZE = int(os.environ.get("ADMISSION_QUEUE_SIZE", 100))
+ADMISSION_MAX_WAIT_MS = int(os.environ.get("ADMISSION_MAX_WAIT_MS", 2_000))
+ADMISSION_RETRY_AFTER_SEC = int(os.environ.get("ADMISSION_RETRY_AFTER_SEC", 1))
+ADMISSION_METRICS_PATH = "/admission"
+
+ROUND_PATH = re.compile(r"^/feed-values/\d+/?$")
+
+
+class RouteClass:
+    def __init__(self, name: str, priority: int, concurrency: int, sheddable: bool):
+        self.name = name
+        self.priority = priority
+        self.concurrency = concurrency
+        self.sheddable = sheddable
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed = 0
+
+
+class AdmissionController:
+    """
+    Limits concurrent requests globally and per route class. When a request cannot be admitted it
+    waits in a queue ordered by route priority, so voting round requests are always admitted first.
+    Voting round requests are never shed; other routes are rejected once their queue is full or
+    they waited longer than ADMISSION_MAX_WAIT_MS.
+    """
+
+    def __init__(self):
+        self.logger = logger
+        self.routes: Dict[str, RouteClass] = {
+            "round": RouteClass("round", 0, ADMISSION_MAX_CONCURRENCY, sheddable=False),
+            "current": RouteClass("current", 1, ADMISSION_CURRENT_CONCURRENCY, sheddable=True),
+            "volumes": RouteClass("volumes", 2, ADMISSION_VOLUMES_CONCURRENCY, sheddable=True),
+            "other": RouteClass("other", 3, ADMISSION_OTHER_CONCURRENCY, sheddable=True),
+        }
+        self.in_flight = 0
+        self.waiters: List[Tuple[int, int, RouteClass, asyncio.Future]] = []
+        self.sequence = itertools.count()
+
+    def classify(self, path: str) -> RouteClass:
+        if ROUND_PATH.match(path):
+            return self.routes["round"]
+        if path.rstrip("/") == "/feed-values":
+            return self.routes["current"]
+        if path.rstrip("/") == "/volumes":
+            return self.routes["volumes"]
+        return self.routes["other"]
+
+    async def acquire(self, route: RouteClass) -> bool:
+        """Waits until the request may proceed, returns False if it was shed."""
+        if self._can_admit(route) and not any(w[0] <= route.priority and not w[3].done() for w in self.waiters):
+            self._admit(route)
+            return True
+        if route.sheddable and route.queued >= ADMISSION_QUEUE_SIZE:
+            route.shed += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (route.priority, next(self.sequence), route, future))
+        route.queued += 1
+        try:
+            if route.sheddable:
+                await asyncio.wait_for(asyncio.shield(future), ADMISSION_MAX_WAIT_MS / 1000)
+            else:
+                await future
+            return True
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                return True
+            future.cancel()
+            route.shed += 1
+            return False
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(route)
+            else:
+                future.cancel()
+            raise
+        finally:
+            route.queued -= 1
+
+    def release(self, route: RouteClass):
+        route.in_flight -= 1
+        self.in_flight -= 1
+        self._dispatch()
+
+    def metrics(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": sum(route.queued for route in self.routes.values()),
+            "routes": {
+                name: {
+                    "in_flight": route.in_flight,
+                    "queued": route.queued,
+                    "admitted": route.admitted,
+                    "shed": route.shed,
+                }
+                for name, route in self.routes.items()
+            },
+        }
+
+    def _can_admit(self, route: RouteClass) -> bool:
+        return self.in_flight < ADMISSION_MAX_CONCURRENCY and route.in_flight < route.concurrency
+
+    def _admit(self, route: RouteClass):
+        route.in_flight += 1
+        route.admitted += 1
+        self.in_flight += 1
+
+    def _dispatch(self):
+        blocked = []
+        while self.waiters and self.in_flight < ADMISSION_MAX_CONCURRENCY:
+            waiter = heapq.heappop(self.waiters)
+            _, _, route, future = waiter
+            if future.done():
+                continue
+            if route.in_flight >= route.concurrency:
+                blocked.append(waiter)
+                continue
+            self._admit(route)
+            future.set_result(None)
+        for waiter in blocked:
+            heapq.heappush(self.waiters, waiter)
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware applying an AdmissionController to HTTP requests and serving its metrics."""
+
+    def __init__(self, app, controller: AdmissionController | None = None):
+        self.app = app
+        self.controller = controller or AdmissionController()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["path"] == ADMISSION_METRICS_PATH:
+            await self._respond(send, 200, self.controller.metrics())
+            return
+
+        route = self.controller.classify(scope["path"])
+        if not await self.controller.acquire(route):
+            self.controller.logger.warning(f"Shedding {scope['path']} request, server overloaded")
+            await self._respond(
+                send,
+                503,
+                {"detail": "Server overloaded, retry later"},
+                [(b"retry-after", str(ADMISSION_RETRY_AFTER_SEC).encode())],
+            )
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route)
+
+    async def _respond(self, send, status: int, body: Dict, headers: List[Tuple[bytes, bytes]] = ()):
+        content = json.dumps(body).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(content)).encode()), *headers],
+            }
+        )
+        await send({"type": "http.response.body", "body": content})
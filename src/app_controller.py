@@ -1,9 +1,11 @@
-from fastapi import Body, Query, Path
+from fastapi import Body, HTTPException, Query, Path
+from fastapi.responses import StreamingResponse
 from nest.core import Controller, Post
 from loguru import logger
 from typing import Annotated
 
 from app_service import AppService
+from data_feeds.history_export import check_format, default_format, media_type
 from dto.provider_requests import (
     FeedValuesRequest,
     FeedValuesResponse,
@@ -24,7 +26,7 @@ class AppController:
         voting_round_id: Annotated[int, Path(alias="voting_round_id")],
         body: FeedValuesRequest = Body(...),
     ) -> RoundFeedValuesResponse:
-        values = await self.app_service.get_values(body.feeds)
+        values = await self.app_service.get_values(body.feeds, voting_round_id)
         self.logger.info(f"Feed values for voting round {voting_round_id}: {values}")
         return RoundFeedValuesResponse(votingRoundId=voting_round_id, data=values)
 
@@ -43,3 +45,31 @@ class AppController:
         values = await self.app_service.get_volumes(body.feeds, window_sec)
         self.logger.info(f"Feed volumes for last {window_sec} seconds: {values}")
         return FeedVolumesResponse(data=values)
+
+    @Post("export/volumes")
+    async def export_feed_volumes(
+        self,
+        body: FeedValuesRequest = Body(...),
+        fmt: str | None = Query(None, alias="format"),
+    ) -> StreamingResponse:
+        """Streams the per-second volume history of the feed sources as Arrow IPC or compact binary."""
+        fmt = self._export_format(fmt)
+        return StreamingResponse(self.app_service.export_volumes(body.feeds, fmt), media_type=media_type(fmt))
+
+    @Post("export/prices")
+    async def export_feed_prices(
+        self,
+        body: FeedValuesRequest = Body(...),
+        fmt: str | None = Query(None, alias="format"),
+    ) -> StreamingResponse:
+        """Streams the recent price history of the feed sources as Arrow IPC or compact binary."""
+        fmt = self._export_format(fmt)
+        return StreamingResponse(self.app_service.export_prices(body.feeds, fmt), media_type=media_type(fmt))
+
+    def _export_format(self, fmt: str | None) -> str:
+        fmt = fmt or default_format()
+        try:
+            check_format(fmt)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return fmt
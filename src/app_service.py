@@ -1,19 +1,51 @@
-from typing import List
+import os
+import time
+from typing import AsyncIterator, List
 from injector import inject
 from data_feeds.base_feed import BaseDataFeed
+from data_feeds.history_export import Chunk, stream_prices, stream_volumes
 from dto.provider_requests import FeedId, FeedValueData, FeedVolumeData
+from history.history_writer import HistoryWriter
+from utils.voting_round_utils import VALUES_AS_OF_OFFSET_MS, voting_round_end_ms, voting_round_start_ms
+
+# Serve voting round values as of a round boundary (plus VALUES_AS_OF_OFFSET_MS) instead of the latest prices
+VALUES_AS_OF_ROUND = os.environ.get("VALUES_AS_OF_ROUND", "false").lower() == "true"
+# "end" queries prices when the round ends and its values are committed, "start" when it begins
+VALUES_AS_OF_ANCHOR = os.environ.get("VALUES_AS_OF_ANCHOR", "end").lower()
 
 
 class AppService:
     @inject
-    def __init__(self, data_feed: BaseDataFeed):
+    def __init__(self, data_feed: BaseDataFeed, history: HistoryWriter):
         self.data_feed = data_feed
+        self.history = history
 
     async def get_value(self, feed: FeedId) -> FeedValueData:
         return await self.data_feed.get_value(feed)
 
-    async def get_values(self, feeds: List[FeedId]) -> List[FeedValueData]:
-        return await self.data_feed.get_values(feeds)
+    async def get_values(self, feeds: List[FeedId], voting_round_id: int | None = None) -> List[FeedValueData]:
+        as_of = self._as_of(voting_round_id)
+        if as_of is not None:
+            values = await self.data_feed.get_values_at(feeds, as_of)
+        else:
+            values = await self.data_feed.get_values(feeds)
+        if self.history.enabled:
+            self.history.record(voting_round_id, values, self.data_feed.get_source_prices(feeds, as_of))
+        return values
+
+    def _as_of(self, voting_round_id: int | None) -> int | None:
+        if not VALUES_AS_OF_ROUND or voting_round_id is None:
+            return None
+        boundary = voting_round_start_ms(voting_round_id) if VALUES_AS_OF_ANCHOR == "start" else voting_round_end_ms(voting_round_id)
+        as_of = boundary + VALUES_AS_OF_OFFSET_MS
+        # Rounds that have not started yet are served with the latest values
+        return as_of if as_of <= int(time.time() * 1000) else None
 
     async def get_volumes(self, feeds: List[FeedId], volume_window: int) -> List[FeedVolumeData]:
-        return await self.data_feed.get_volumes(feeds, volume_window)
\ No newline at end of file
+        return await self.data_feed.get_volumes(feeds, volume_window)
+
+    def export_volumes(self, feeds: List[FeedId], fmt: str) -> AsyncIterator[Chunk]:
+        return stream_volumes(self.data_feed.volume_histories(feeds), fmt)
+
+    def export_prices(self, feeds: List[FeedId], fmt: str) -> AsyncIterator[Chunk]:
+        return stream_prices(self.data_feed.price_histories(feeds), fmt)
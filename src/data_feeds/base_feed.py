@@ -1,8 +1,31 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterator, List, NamedTuple, Tuple
 from dto.provider_requests import FeedId, FeedValueData, FeedVolumeData
 
 
+class SourcePrice(NamedTuple):
+    exchange: str
+    symbol: str
+    value: float
+    time: int
+
+
+class VolumeHistory(NamedTuple):
+    exchange: str
+    symbol: str
+    start_sec: int
+    # Per-second volumes from start_sec on, possibly split into several views of the underlying buffer
+    volumes: Tuple[memoryview, ...]
+
+
+class PriceSeries(NamedTuple):
+    exchange: str
+    symbol: str
+    # Millisecond times and prices, oldest first, split the same way
+    times: Tuple[memoryview, ...]
+    prices: Tuple[memoryview, ...]
+
+
 class BaseDataFeed(ABC):
     @abstractmethod
     async def get_value(self, feed: FeedId) -> FeedValueData:
@@ -12,6 +35,18 @@ class BaseDataFeed(ABC):
     async def get_values(self, feeds: List[FeedId]) -> List[FeedValueData]:
         pass
 
+    async def get_values_at(self, feeds: List[FeedId], timestamp: int) -> List[FeedValueData]:
+        return await self.get_values(feeds)
+
     @abstractmethod
     async def get_volumes(self, feeds: List[FeedId], volume_window: int) -> List[FeedVolumeData]:
-        pass
\ No newline at end of file
+        pass
+
+    def get_source_prices(self, feeds: List[FeedId], as_of: int | None = None) -> List[List[SourcePrice]]:
+        return [[] for _ in feeds]
+
+    def volume_histories(self, feeds: List[FeedId]) -> Iterator[VolumeHistory]:
+        return iter(())
+
+    def price_histories(self, feeds: List[FeedId]) -> Iterator[PriceSeries]:
+        return iter(())
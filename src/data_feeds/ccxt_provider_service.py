@@ -2,26 +2,56 @@ import asyncio
 import ccxt.pro as ccxtpro
 import ccxt
 import json
-import math
 import os
 import random
+import sys
 import time
 from enum import Enum
-from typing import List, Dict, Any, Set
+from typing import List, Dict, Any, Iterator, Set, Tuple, Callable
 from loguru import logger
 from pydantic import BaseModel
 from pathlib import Path
 
-from data_feeds.base_feed import BaseDataFeed
+from data_feeds.base_feed import BaseDataFeed, PriceSeries, SourcePrice, VolumeHistory
+from data_feeds.cluster import CLUSTER_ROLE, ClusterPublisher, FrameApplier, FrameDecoder, cluster_transport
+from data_feeds.cold_fetch import ColdFetcher
+from data_feeds.feed_index import FeedIndex
+from data_feeds.http_pool import HTTP_POOL_STATS_INTERVAL_MS, HttpPool
+from data_feeds.lean_trades import LeanTrade, LeanTradeAdapter, lean_adapter_for, watch_lean_trades
+from data_feeds.outliers import filter_outliers
+from data_feeds.request_scheduler import Priority, RequestScheduler
+from data_feeds.weights import DecayTable, decay_table
 from data_feeds.volumes import VolumeStore
 from dto.provider_requests import FeedId, FeedValueData, FeedVolumeData
+from utils.coalesce_utils import SingleFlight
 from utils.error_utils import as_error
-from utils.retry_utils import retry, sleep_for, RetryError
+from utils.lifecycle_utils import (
+    SHUTDOWN_TIMEOUT_MS,
+    STATE_SNAPSHOT_INTERVAL_MS,
+    STATE_SNAPSHOT_MAX_AGE_MS,
+    STATE_SNAPSHOT_PATH,
+    Deadline,
+    TaskTracker,
+    gather_within,
+    write_atomically,
+)
+from utils.retry_utils import sleep_for, RetryError
 from injector import singleton
 
 RETRY_BACKOFF_MS = 10_000
 LAMBDA = float(os.environ.get("MEDIAN_DECAY", 0.00005))
+# Source weights of the median: "decay" by price staleness, "volume" by rolling volume, "volume_decay" by both
+MEDIAN_WEIGHTING = os.environ.get("MEDIAN_WEIGHTING", "decay").lower()
 TRADES_HISTORY_SIZE = int(os.environ.get("TRADES_HISTORY_SIZE", 1000))
+CONFIG_RELOAD_INTERVAL_MS = int(os.environ.get("CONFIG_RELOAD_INTERVAL_MS", 10_000))
+COALESCE_WINDOW_MS = int(os.environ.get("COALESCE_WINDOW_MS", 50))
+# "drain" empties ccxt's per-symbol trade cache once trades are processed, "keep" retains up to TRADES_HISTORY_SIZE
+TRADES_RETENTION = os.environ.get("TRADES_RETENTION", "drain").lower()
+TRADE_CACHE_STATS_INTERVAL_MS = int(os.environ.get("TRADE_CACHE_STATS_INTERVAL_MS", 300_000))
+# Cadence of the background recomputation of feeds whose sources changed, 0 computes them on request only
+MEDIAN_RECOMPUTE_INTERVAL_MS = int(os.environ.get("MEDIAN_RECOMPUTE_INTERVAL_MS", 250))
+# Feed values are recomputed after this long even without source updates, as source staleness keeps growing
+MEDIAN_MAX_AGE_MS = int(os.environ.get("MEDIAN_MAX_AGE_MS", 30_000))
 
 
 class FeedCategory(Enum):
@@ -37,15 +67,23 @@ class FeedConfigSource(BaseModel):
     symbol: str
 
 
+class FeedProfile(BaseModel):
+    decay: float | None = None
+    weights: Dict[str, float] = {}
+
+
 class FeedConfig(BaseModel):
     feed: FeedId
     sources: List[FeedConfigSource]
+    decay: float | None = None
+    weights: Dict[str, float] = {}
 
 
 class PriceInfo(BaseModel):
     value: float
     time: int
     exchange: str
+    weight: float = 1.0
 
 
 class LoadResult(BaseModel):
@@ -66,38 +104,162 @@ class CcxtFeed(BaseDataFeed):
         self.logger = logger
         self.initialized = False
         self.config: List[FeedConfig] = []
-        self.config_by_key: Dict[str, FeedConfig] = {}
+        self.index = FeedIndex([], usdt_to_usd_feed_id, LAMBDA)
         self.exchange_by_name: Dict[str, ccxt.Exchange] = {}
-        self.latest_price: Dict[str, Dict[str, PriceInfo]] = {}
         self.volumes: Dict[str, Dict[str, VolumeStore]] = {}
-        self.fetch_attempted: Set[str] = set()
+        self.scheduler = RequestScheduler()
+        self.http_pool = HttpPool()
+        # Every background task of the feed, cancelled together on shutdown
+        self.tasks = TaskTracker()
+        self.cold_fetcher = ColdFetcher(self.exchange_by_name, self._set_price, self.scheduler, self.tasks.spawn)
+        self.config_mtime: int | None = None
+        self.watched_symbols: Dict[str, Set[str]] = {}
+        self.watch_tasks: Dict[Tuple[str, str | None], asyncio.Task] = {}
+        self.lean_fallback: Set[str] = set()
+        self.value_flight = SingleFlight(COALESCE_WINDOW_MS)
+        self.response_flight = SingleFlight(COALESCE_WINDOW_MS)
+        # Set on cluster collectors, receives all price and trade updates for replicas
+        self.publisher: ClusterPublisher | None = None
 
     async def start(self):
+        self.cold_fetcher.loop = asyncio.get_running_loop()
         self.config = self._load_config()
-        exchange_to_symbols: Dict[str, Set[str]] = {}
+        self.config_mtime = self._config_mtime()
+        self._restore_state()
+        exchange_to_symbols = self._exchange_to_symbols(self.config)
 
-        for feed in self.config:
-            for source in feed.sources:
-                symbols = exchange_to_symbols.get(source.exchange, set())
-                symbols.add(source.symbol)
-                exchange_to_symbols[source.exchange] = symbols
+        if CLUSTER_ROLE == "collector":
+            publisher = ClusterPublisher(cluster_transport(), self)
+            await publisher.start()
+            self.publisher = publisher
 
         self.logger.info(f"Connecting to exchanges: {list(exchange_to_symbols.keys())}")
-        load_exchanges = []
         self.logger.info(f"Initializing exchanges with trade limit {TRADES_HISTORY_SIZE}")
+        await self._init_exchanges(exchange_to_symbols)
+        await self._init_watch_trades(exchange_to_symbols)
+
+        self.initialized = True
+        self.logger.info("Initialization done, watching trades...")
+
+        if CONFIG_RELOAD_INTERVAL_MS > 0:
+            self.tasks.spawn(self._watch_config())
+        if TRADE_CACHE_STATS_INTERVAL_MS > 0:
+            self.tasks.spawn(self._log_trade_cache_stats())
+        if MEDIAN_RECOMPUTE_INTERVAL_MS > 0:
+            self.tasks.spawn(self._recompute_feeds())
+        if HTTP_POOL_STATS_INTERVAL_MS > 0:
+            self.tasks.spawn(self.http_pool.log_metrics())
+        self._start_state_snapshots()
+
+    async def stop(self):
+        """
+        Saves the state snapshot, then cancels all background tasks and closes all exchanges in
+        parallel. Both get SHUTDOWN_TIMEOUT_MS in total, connections still open after that are abandoned.
+        """
+        deadline = Deadline(SHUTDOWN_TIMEOUT_MS)
+        self._save_state()
+        self.watch_tasks = {}
+        await self.tasks.cancel_all(deadline.remaining())
+        if self.publisher is not None:
+            await self.publisher.stop()
+
+        exchanges = list(self.exchange_by_name.items())
+        self.exchange_by_name.clear()
+        unfinished = await gather_within([self._close(name, exchange) for name, exchange in exchanges], deadline.remaining())
+        await self.http_pool.close()
+        if unfinished:
+            self.logger.warning(f"{unfinished} of {len(exchanges)} exchanges did not close within {SHUTDOWN_TIMEOUT_MS} ms")
+        else:
+            self.logger.info(f"Closed {len(exchanges)} exchanges")
+
+    async def wait_ready(self, timeout_ms: int) -> bool:
+        """Waits until every feed has a price from at least one source, for at most `timeout_ms`."""
+        deadline = Deadline(timeout_ms)
+        while True:
+            index = self.index
+            missing = [cfg.feed.name for cfg, slots in zip(index.configs, index.feed_slots) if not any(index.times[slot] for slot in slots)]
+            if not missing:
+                return True
+            if deadline.remaining() <= 0:
+                self.logger.warning(f"Serving without prices for {len(missing)} feeds: {missing[:10]}")
+                return False
+            await asyncio.sleep(min(0.1, deadline.remaining()))
+
+    def _start_state_snapshots(self):
+        if STATE_SNAPSHOT_PATH and STATE_SNAPSHOT_INTERVAL_MS > 0:
+            self.tasks.spawn(self._save_state_periodically())
+
+    async def _save_state_periodically(self):
+        while True:
+            await sleep_for(STATE_SNAPSHOT_INTERVAL_MS)
+            self._save_state()
+
+    def _save_state(self):
+        if not STATE_SNAPSHOT_PATH:
+            return
+        try:
+            snapshot = ClusterPublisher(None, self).snapshot()
+            write_atomically(STATE_SNAPSHOT_PATH, snapshot)
+            self.logger.debug(f"Saved prices and volumes to {STATE_SNAPSHOT_PATH} ({len(snapshot)} bytes)")
+        except Exception as e:
+            self.logger.error(f"Failed to save state to {STATE_SNAPSHOT_PATH}: {as_error(e)}")
+
+    def _restore_state(self):
+        """Restores prices and volume histories saved by a previous process, if saved recently enough."""
+        if not STATE_SNAPSHOT_PATH or not os.path.exists(STATE_SNAPSHOT_PATH):
+            return
+        age_ms = (time.time() - os.path.getmtime(STATE_SNAPSHOT_PATH)) * 1000
+        if age_ms > STATE_SNAPSHOT_MAX_AGE_MS:
+            self.logger.info(f"Ignoring state snapshot saved {age_ms / 1000:.0f}s ago")
+            return
+        try:
+            with open(STATE_SNAPSHOT_PATH, "rb") as f:
+                frames = FrameDecoder().feed(f.read())
+            applier = FrameApplier(self)
+            for body in frames:
+                applier.apply(body)
+        except Exception as e:
+            self.logger.error(f"Failed to restore state from {STATE_SNAPSHOT_PATH}: {as_error(e)}")
+            return
+        # Trades already counted in the snapshot may be received again, e.g. by polling exchanges
+        for stores in self.volumes.values():
+            for store in stores.values():
+                store.skip_until(store.last_ts)
+        self.logger.info(f"Restored prices and volumes saved {age_ms / 1000:.1f}s ago")
+
+    def _exchange_to_symbols(self, config: List[FeedConfig]) -> Dict[str, Set[str]]:
+        exchange_to_symbols: Dict[str, Set[str]] = {}
+        for feed in config:
+            for source in feed.sources:
+                exchange_to_symbols.setdefault(source.exchange, set()).add(source.symbol)
+        return exchange_to_symbols
+
+    async def _init_exchanges(self, exchange_to_symbols: Dict[str, Set[str]]):
+        """Creates and loads markets for exchanges not connected yet, dropping the ones that fail."""
+        load_exchanges = []
         for exchange_name in list(exchange_to_symbols.keys()):
+            if exchange_name in self.exchange_by_name:
+                continue
             try:
-                exchange: ccxt.Exchange = getattr(ccxtpro, exchange_name)({'newUpdates': True})
+                # All exchanges share one pooled session, see HttpPool
+                exchange: ccxt.Exchange = getattr(ccxtpro, exchange_name)(
+                    {'newUpdates': True, 'session': self.http_pool.open()}
+                )
                 exchange.options["tradesLimit"] = TRADES_HISTORY_SIZE
                 self.exchange_by_name[exchange_name] = exchange
                 load_exchanges.append(
-                    (exchange_name, retry(lambda: exchange.load_markets(), 2, RETRY_BACKOFF_MS))
+                    (
+                        exchange_name,
+                        self.scheduler.for_exchange(exchange_name, exchange).run(
+                            Priority.METADATA, exchange.load_markets, 2, RETRY_BACKOFF_MS
+                        ),
+                    )
                 )
             except Exception as e:
                 self.logger.warning(f"Failed to initialize exchange {exchange_name}, ignoring: {e}")
                 del exchange_to_symbols[exchange_name]
 
-        self.logger.info("Initializing all exchanges")
+        self.logger.info(f"Initializing exchanges: {[name for name, _ in load_exchanges]}")
         load_results = await asyncio.gather(
             *[self._wrap_load_promise(exchange_name, promise) for exchange_name, promise in load_exchanges]
         )
@@ -107,14 +269,10 @@ class CcxtFeed(BaseDataFeed):
                 self.logger.info(f"Exchange {res.exchange_name} initialized successfully.")
             else:
                 self.logger.warning(f"Failed to load markets for {res.exchange_name}: {res.result['reason']}")
+                self.exchange_by_name.pop(res.exchange_name, None)
                 if res.exchange_name in exchange_to_symbols:
                     del exchange_to_symbols[res.exchange_name]
 
-        await self._init_watch_trades(exchange_to_symbols)
-
-        self.initialized = True
-        self.logger.info("Initialization done, watching trades...")
-
     async def _wrap_load_promise(self, exchange_name, promise):
         try:
             result = await promise
@@ -123,28 +281,84 @@ class CcxtFeed(BaseDataFeed):
             return LoadResult(exchange_name=exchange_name, result={'status': 'rejected', 'reason': e})
 
     async def get_values(self, feeds: List[FeedId]) -> List[FeedValueData]:
-        return await asyncio.gather(*[self.get_value(feed) for feed in feeds])
+        key = tuple((feed.category, feed.name) for feed in feeds)
+        return self.response_flight.run(
+            key, lambda: [FeedValueData(feed=feed, value=price) for feed, price in zip(feeds, self._get_feed_prices(feeds))]
+        )
+
+    async def get_values_at(self, feeds: List[FeedId], timestamp: int) -> List[FeedValueData]:
+        key = (timestamp, *((feed.category, feed.name) for feed in feeds))
+        return self.response_flight.run(
+            key,
+            lambda: [
+                FeedValueData(feed=feed, value=price)
+                for feed, price in zip(feeds, self._get_feed_prices(feeds, timestamp))
+            ],
+        )
 
     async def get_value(self, feed: FeedId) -> FeedValueData:
-        price = await self._get_feed_price(feed)
-        return FeedValueData(feed=feed, value=price)
+        return FeedValueData(feed=feed, value=self._get_feed_prices([feed])[0])
+
+    def get_source_prices(self, feeds: List[FeedId], as_of: int | None = None) -> List[List[SourcePrice]]:
+        index = self.index
+        results = []
+        for feed in feeds:
+            fid = index.feed_id(feed)
+            slots = index.feed_slots[fid] if fid is not None else ()
+            sources = []
+            if as_of is not None and fid is not None and self._history_reaches(index, fid, as_of):
+                for slot in slots:
+                    point = index.history.price_at(slot, as_of)
+                    if point is not None:
+                        sources.append(SourcePrice(*index.sources[slot], *point))
+            # Like the feed value, feeds without full history at `as_of` fall back to the latest prices
+            if not sources:
+                sources = [SourcePrice(*index.sources[slot], index.prices[slot], index.times[slot]) for slot in slots if index.times[slot]]
+            results.append(sources)
+        return results
+
+    def volume_histories(self, feeds: List[FeedId]) -> Iterator[VolumeHistory]:
+        """
+        Yields the raw per-second volume buckets of the sources of `feeds`, including USDT-quoted
+        sources of USD feeds. Histories are views of the live buffers taken as the consumer advances,
+        so each one reflects its store when it is written out and must be copied before awaiting.
+        """
+        for feed in feeds:
+            symbols = [feed.name]
+            if feed.name.endswith("/USD"):
+                symbols.append(feed.name.replace("/USD", "/USDT"))
+            for symbol in symbols:
+                for exchange, store in list(self.volumes.get(symbol, {}).items()):
+                    start_sec, volumes = store.history()
+                    if volumes:
+                        yield VolumeHistory(exchange, symbol, start_sec, volumes)
+
+    def price_histories(self, feeds: List[FeedId]) -> Iterator[PriceSeries]:
+        index = self.index
+        for feed in feeds:
+            fid = index.feed_id(feed)
+            for slot in index.feed_slots[fid] if fid is not None else ():
+                times, prices = index.history.series(slot)
+                if times:
+                    yield PriceSeries(*index.sources[slot], times, prices)
 
     async def get_volumes(self, feeds: List[FeedId], volume_window: int) -> List[FeedVolumeData]:
-        usdt_to_usd = await self._get_feed_price(usdt_to_usd_feed_id)
+        usdt_to_usd = self._get_feed_prices([usdt_to_usd_feed_id])[0]
         results = []
 
         for feed in feeds:
             vol_map = {}
             vol_by_exchange = self.volumes.get(feed.name)
             if vol_by_exchange:
-                for exchange, vol_store in vol_by_exchange.items():
+                # Copied first, the ingestion thread may add stores while this runs
+                for exchange, vol_store in list(vol_by_exchange.items()):
                     vol_map[exchange] = vol_store.get_volume(volume_window)
 
             if feed.name.endswith("/USD") and usdt_to_usd is not None:
                 usdt_name = feed.name.replace("/USD", "/USDT")
                 usdt_vol_by_exchange = self.volumes.get(usdt_name)
                 if usdt_vol_by_exchange:
-                    for exchange, vol_store in usdt_vol_by_exchange.items():
+                    for exchange, vol_store in list(usdt_vol_by_exchange.items()):
                         base_vol = vol_map.get(exchange, 0)
                         usdt_vol = round(vol_store.get_volume(volume_window) * usdt_to_usd)
                         vol_map[exchange] = base_vol + usdt_vol
@@ -163,42 +377,83 @@ class CcxtFeed(BaseDataFeed):
             if exchange is None:
                 continue
 
-            market_ids = []
             for symbol in symbols:
-                if symbol in exchange.markets:
-                    market_ids.append(exchange.markets[symbol]["id"])
-                else:
+                if symbol not in exchange.markets:
                     self.logger.warning(f"Market not found for {symbol} on {exchange_name}")
 
-            asyncio.create_task(self._watch(exchange, list(symbols), exchange_name))
+            self._watch(exchange, symbols, exchange_name)
+
+    def _watch(self, exchange: ccxt.Exchange, symbols: Set[str], exchange_name: str):
+        """Reconciles the running watch tasks of an exchange with the given set of symbols."""
+        watched = self.watched_symbols.get(exchange_name, set())
+        added, removed = symbols - watched, watched - symbols
+        if not added and not removed:
+            return
 
-    async def _watch(self, exchange: ccxt.Exchange, symbols: List[str], exchange_name: str):
-        self.logger.info(f"Watching trades for {symbols} on exchange {exchange_name}")
-        if exchange.has.get("watchTradesForSymbols") and exchange.id != "bybit":
-            await self._watch_trades_for_symbols(exchange, symbols)
+        self.logger.info(f"Watching trades for {sorted(symbols)} on exchange {exchange_name}")
+        self.watched_symbols[exchange_name] = set(symbols)
+
+        adapter = lean_adapter_for(exchange_name) if exchange_name not in self.lean_fallback else None
+        if adapter is not None:
+            # The lean stream subscribes to every symbol on connect, so removed symbols are dropped by
+            # restarting it with the new set, which closes the old connection and its subscriptions
+            self._cancel_watch_task((exchange_name, None))
+            if symbols:
+                self._start_watch_task((exchange_name, None), self._watch_lean_trades(exchange, adapter, symbols, exchange_name))
+        elif exchange.has.get("watchTradesForSymbols") and exchange.id != "bybit":
+            self._cancel_watch_task((exchange_name, None))
+            if symbols:
+                self._start_watch_task((exchange_name, None), self._watch_trades_for_symbols(exchange, list(symbols)))
+            if removed and exchange.has.get("unWatchTradesForSymbols"):
+                self.tasks.spawn(self._unwatch_trades(exchange, list(removed)))
         elif exchange.has.get("watchTrades"):
-            for symbol in symbols:
-                asyncio.create_task(self._watch_trades_for_symbol(exchange, symbol))
+            for symbol in removed:
+                self._cancel_watch_task((exchange_name, symbol))
+                if exchange.has.get("unWatchTrades"):
+                    self.tasks.spawn(self._unwatch_symbol_trades(exchange, symbol))
+            for symbol in added:
+                self._start_watch_task((exchange_name, symbol), self._watch_trades_for_symbol(exchange, symbol))
         else:
             self.logger.warning(f"Exchange {exchange.id} does not support watching trades, polling for trades instead")
-            await self._fetch_trades(exchange, symbols, exchange_name)
+            self._cancel_watch_task((exchange_name, None))
+            if symbols:
+                self._start_watch_task((exchange_name, None), self._fetch_trades(exchange, list(symbols), exchange_name))
+
+    def _start_watch_task(self, key: Tuple[str, str | None], coro):
+        self.watch_tasks[key] = self.tasks.spawn(coro)
+
+    def _cancel_watch_task(self, key: Tuple[str, str | None]):
+        task = self.watch_tasks.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    async def _unwatch_trades(self, exchange: ccxt.Exchange, symbols: List[str]):
+        try:
+            await exchange.un_watch_trades_for_symbols(symbols)
+        except Exception as e:
+            self.logger.debug(f"Failed to unsubscribe from {symbols} on {exchange.id}: {as_error(e)}")
+
+    async def _unwatch_symbol_trades(self, exchange: ccxt.Exchange, symbol: str):
+        try:
+            await exchange.un_watch_trades(symbol)
+        except Exception as e:
+            self.logger.debug(f"Failed to unsubscribe from {symbol} on {exchange.id}: {as_error(e)}")
 
     async def _fetch_trades(self, exchange: ccxt.Exchange, symbols: List[str], exchange_name: str):
+        scheduler = self.scheduler.for_exchange(exchange_name, exchange)
         while True:
             try:
-                async def fetch_action():
-                    for symbol in symbols:
-                        trades = await exchange.fetch_trades(symbol)
-                        if trades:
-                            trades.sort(key=lambda t: t['timestamp'], reverse=True)
-                            latest_trade = trades[0]
-                            last_price_time = (self.latest_price.get(latest_trade['symbol'], {}).get(exchange.id, PriceInfo(value=0, time=0, exchange=''))).time
-                            if latest_trade['timestamp'] > last_price_time:
-                                self._set_price(exchange.id, latest_trade['symbol'], latest_trade['price'], latest_trade['timestamp'])
-                        else:
-                            self.logger.warning(f"No trades found for {symbol} on {exchange_name}")
-
-                await retry(fetch_action, 5, 2000)
+                for symbol in symbols:
+                    trades = await scheduler.run(Priority.POLLING, lambda: exchange.fetch_trades(symbol), 5, 2000)
+                    if trades:
+                        trades.sort(key=lambda t: t['timestamp'], reverse=True)
+                        latest_trade = trades[0]
+                        last_price_time = self.index.price_time(exchange.id, latest_trade['symbol'])
+                        if latest_trade['timestamp'] > last_price_time:
+                            self._set_price(exchange.id, latest_trade['symbol'], latest_trade['price'], latest_trade['timestamp'])
+                    else:
+                        self.logger.warning(f"No trades found for {symbol} on {exchange_name}")
+
                 await sleep_for(1_000)
             except Exception as e:
                 error = as_error(e)
@@ -209,129 +464,282 @@ class CcxtFeed(BaseDataFeed):
                     raise error
 
     async def _watch_trades_for_symbols(self, exchange: ccxt.Exchange, symbols: List[str]):
-        since_by_symbol = {}
         while True:
             try:
                 trades = await exchange.watch_trades_for_symbols(symbols)
-                new_trades = [trade for trade in trades if trade['timestamp'] > since_by_symbol.get(trade['symbol'], 0)]
-                new_trades.sort(key=lambda t: t['timestamp'])
-
-                if not new_trades:
+                if not trades:
                     await sleep_for(1000)
                     continue
 
-                last_trade = new_trades[-1]
-                self._set_price(exchange.id, last_trade['symbol'], last_trade['price'], last_trade['timestamp'])
-                since_by_symbol[last_trade['symbol']] = last_trade['timestamp']
-                self._process_volume(exchange.id, last_trade['symbol'], new_trades)
+                trades_by_symbol: Dict[str, List[Dict]] = {}
+                for trade in trades:
+                    trades_by_symbol.setdefault(trade['symbol'], []).append(trade)
+                for symbol, symbol_trades in trades_by_symbol.items():
+                    self._process_trades(exchange.id, symbol, symbol_trades)
             except Exception as e:
                 self.logger.debug(f"Failed to watch trades for {exchange.id}/{symbols}: {as_error(e)}, will retry")
                 await sleep_for(10_000)
 
     async def _watch_trades_for_symbol(self, exchange: ccxt.Exchange, symbol: str):
-        since = None
         while True:
             try:
-                trades = await exchange.watch_trades(symbol, since)
+                trades = await exchange.watch_trades(symbol)
                 if not trades:
                     await sleep_for(1_000)
                     continue
 
-                trades.sort(key=lambda t: t['timestamp'])
-                last_trade = trades[-1]
-                self._set_price(exchange.id, last_trade['symbol'], last_trade['price'], last_trade['timestamp'])
-                since = last_trade['timestamp'] + 1
-                self._process_volume(exchange.id, last_trade['symbol'], trades)
+                self._process_trades(exchange.id, trades[-1]['symbol'], trades)
             except Exception as e:
                 self.logger.debug(f"Failed to watch trades for {exchange.id}/{symbol}: {as_error(e)}, will retry")
                 await sleep_for(5_000 + random.random() * 10_000)
 
-    def _process_volume(self, exchange_id: str, symbol: str, trades: List[Dict]):
+    async def _watch_lean_trades(
+        self, exchange: ccxt.Exchange, adapter: LeanTradeAdapter, symbols: Set[str], exchange_name: str
+    ):
+        symbol_by_market_id = {exchange.markets[symbol]["id"]: symbol for symbol in symbols if symbol in exchange.markets}
+        await watch_lean_trades(
+            exchange_name, adapter, symbol_by_market_id, self._on_lean_trades, self.http_pool.open()
+        )
+
+        self.logger.warning(f"Falling back to ccxt for watching trades on {exchange_name}")
+        self.lean_fallback.add(exchange_name)
+        self.watch_tasks.pop((exchange_name, None), None)
+        self.watched_symbols.pop(exchange_name, None)
+        self._watch(exchange, symbols, exchange_name)
+
+    def _on_lean_trades(self, exchange_name: str, symbol: str, trades: List[LeanTrade]):
+        new_trades = self._volume_store(exchange_name, symbol).process_lean_trades(trades)
+        if new_trades:
+            if self.publisher is not None:
+                self.publisher.trades(exchange_name, symbol, [trade[:3] for trade in new_trades])
+            timestamp, price, _, _ = max(new_trades, key=lambda t: t[0])
+            self._set_latest_price(exchange_name, symbol, price, timestamp)
+
+    def _process_trades(self, exchange_id: str, symbol: str, trades: List[Dict]):
+        # Trades replayed after a reconnect are recognized by id, so neither volume nor price is applied twice
+        new_trades = self._volume_store(exchange_id, symbol).process_trades(trades)
+        if TRADES_RETENTION == "drain":
+            self._drain_trade_cache(exchange_id, symbol)
+        if new_trades:
+            if self.publisher is not None:
+                self.publisher.trades(exchange_id, symbol, [(t['timestamp'], t['price'], t['amount']) for t in new_trades])
+            last_trade = max(new_trades, key=lambda t: t['timestamp'])
+            self._set_latest_price(exchange_id, symbol, last_trade['price'], last_trade['timestamp'])
+
+    def _drain_trade_cache(self, exchange_id: str, symbol: str):
+        # ccxt.pro recreates the cache on the next trade message, so dropping it releases the retained trade dicts
+        exchange = self.exchange_by_name.get(exchange_id)
+        trade_caches = getattr(exchange, "trades", None)
+        if trade_caches:
+            trade_caches.pop(symbol, None)
+
+    def trade_cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Trades retained in ccxt caches per exchange, with a rough size estimate based on one sampled trade."""
+        stats = {}
+        for exchange_name, exchange in self.exchange_by_name.items():
+            trade_caches = getattr(exchange, "trades", None) or {}
+            trade_count = 0
+            sample = None
+            for cache in trade_caches.values():
+                trade_count += len(cache)
+                if sample is None and len(cache):
+                    sample = cache[-1]
+            stats[exchange_name] = {
+                "symbols": len(trade_caches),
+                "trades": trade_count,
+                "bytes": trade_count * self._trade_size(sample) if sample is not None else 0,
+            }
+        return stats
+
+    def _trade_size(self, trade: Dict) -> int:
+        size = sys.getsizeof(trade)
+        for value in trade.values():
+            size += sys.getsizeof(value)
+            if isinstance(value, dict):
+                size += sum(sys.getsizeof(v) for v in value.values())
+        return size
+
+    async def _log_trade_cache_stats(self):
+        while True:
+            await sleep_for(TRADE_CACHE_STATS_INTERVAL_MS)
+            stats = self.trade_cache_stats()
+            total = sum(s["bytes"] for s in stats.values())
+            self.logger.info(f"Trade caches retain ~{total // 1024} KiB: {stats}")
+
+    def _volume_store(self, exchange_id: str, symbol: str) -> VolumeStore:
         exchange_volumes = self.volumes.setdefault(symbol, {})
-        volume_store = exchange_volumes.setdefault(exchange_id, VolumeStore())
-        volume_store.process_trades(trades)
+        volume_store = exchange_volumes.get(exchange_id)
+        if volume_store is None:
+            volume_store = exchange_volumes[exchange_id] = VolumeStore()
+        return volume_store
 
-    def _set_price(self, exchange_name: str, symbol: str, price: float, timestamp: int = None):
-        prices = self.latest_price.setdefault(symbol, {})
-        prices[exchange_name] = PriceInfo(
-            value=price,
-            time=timestamp if timestamp is not None else int(time.time() * 1000),
-            exchange=exchange_name,
-        )
+    def _set_latest_price(self, exchange_name: str, symbol: str, price: float, timestamp: int):
+        """Sets the price unless a newer one is already known, e.g. when late trades arrive."""
+        if timestamp >= self.index.price_time(exchange_name, symbol):
+            self._set_price(exchange_name, symbol, price, timestamp)
 
-    async def _get_feed_price(self, feed_id: FeedId) -> float | None:
-        key = self._feed_key(feed_id)
-        config = self.config_by_key.get(key)
-        if not config:
-            self.logger.warning(f"No config found for {feed_id}")
-            return None
+    def _set_price(self, exchange_name: str, symbol: str, price: float, timestamp: int = None):
+        timestamp = timestamp if timestamp is not None else int(time.time() * 1000)
+        if self.index.set_price(exchange_name, symbol, price, timestamp) and self.publisher is not None:
+            self.publisher.price(exchange_name, symbol, price, timestamp)
+
+    def _get_feed_prices(self, feeds: List[FeedId], as_of: int | None = None) -> List[float | None]:
+        """
+        Returns prices for a batch of feeds from the in-memory price table. Latest values are served from the
+        values precomputed by `_recompute_feeds`, feeds still marked dirty are recomputed in place.
+        Only feeds without any prices fall back to the async cold fetch, which runs in the background.
+        If `as_of` is given, source prices are taken from the price history at that timestamp instead.
+        """
+        index = self.index
+        if as_of is None:
+            now = int(time.time() * 1000)
+            return [self._get_latest_feed_price(index, feed, now) for feed in feeds]
 
         usdt_to_usd = None
 
-        async def convert_to_usd(symbol: str, exchange: str, price: float) -> float | None:
+        def usdt_rate() -> float | None:
             nonlocal usdt_to_usd
             if usdt_to_usd is None:
-                usdt_to_usd = await self._get_feed_price(usdt_to_usd_feed_id)
-            if usdt_to_usd is None:
-                self.logger.warning(f"Unable to retrieve USDT to USD conversion rate for {symbol} at {exchange}")
-                return None
-            return price * usdt_to_usd
+                usdt_to_usd = self._get_cached_feed_price(index, usdt_to_usd_feed_id, lambda: None, as_of)
+            return usdt_to_usd
+
+        return [self._get_cached_feed_price(index, feed, usdt_rate, as_of) for feed in feeds]
+
+    def _get_latest_feed_price(self, index: FeedIndex, feed_id: FeedId, now: int) -> float | None:
+        fid = index.feed_id(feed_id)
+        if fid is None:
+            self.logger.warning(f"No config found for {feed_id}")
+            return None
+
+        value = self._get_precomputed_price(index, fid, now)
+        if value is None:
+            self._on_missing_prices(index, fid)
+        return value
+
+    def _get_precomputed_price(self, index: FeedIndex, fid: int, now: int) -> float | None:
+        if index.take_stale(fid, now, MEDIAN_MAX_AGE_MS):
+            index.set_value(
+                fid, self._compute_feed_price(index, fid, lambda: self._get_usdt_rate(index, now), request_missing=False)
+            )
+        return index.values[fid]
 
+    def _get_usdt_rate(self, index: FeedIndex, now: int) -> float | None:
+        if index.usdt_feed_id is None:
+            return None
+        return self._get_precomputed_price(index, index.usdt_feed_id, now)
+
+    async def _recompute_feeds(self):
+        """Recomputes feeds affected by price updates in batches, so request cost does not depend on market activity."""
+        self.logger.info(f"Recomputing updated feeds every {MEDIAN_RECOMPUTE_INTERVAL_MS} ms")
+        while True:
+            await sleep_for(MEDIAN_RECOMPUTE_INTERVAL_MS)
+            index = self.index
+            now = int(time.time() * 1000)
+            try:
+                for fid in range(len(index.values)):
+                    self._get_precomputed_price(index, fid, now)
+            except Exception as e:
+                self.logger.error(f"Failed to recompute feed values: {as_error(e)}")
+
+    def _get_cached_feed_price(
+        self, index: FeedIndex, feed_id: FeedId, usdt_rate: Callable[[], float | None], as_of: int | None = None
+    ) -> float | None:
+        return self.value_flight.run(
+            (feed_id.category, feed_id.name, as_of), lambda: self._get_feed_price(index, feed_id, usdt_rate, as_of)
+        )
+
+    def _get_feed_price(
+        self, index: FeedIndex, feed_id: FeedId, usdt_rate: Callable[[], float | None], as_of: int | None = None
+    ) -> float | None:
+        fid = index.feed_id(feed_id)
+        if fid is None:
+            self.logger.warning(f"No config found for {feed_id}")
+            return None
+        return self._compute_feed_price(index, fid, usdt_rate, as_of)
+
+    def _compute_feed_price(
+        self,
+        index: FeedIndex,
+        fid: int,
+        usdt_rate: Callable[[], float | None],
+        as_of: int | None = None,
+        request_missing: bool = True,
+    ) -> float | None:
+        feed_id = index.configs[fid].feed
+        use_volume = MEDIAN_WEIGHTING != "decay"
         prices = []
-        for source in config.sources:
-            info = self.latest_price.get(source.symbol, {}).get(source.exchange)
-            if not info:
-                continue
+        volumes = []
+        if as_of is not None and not self._history_reaches(index, fid, as_of):
+            self.logger.debug(f"Price history of {feed_id} does not reach back to {as_of}, using latest prices")
+            return self._compute_feed_price(index, fid, usdt_rate, request_missing=request_missing)
+
+        for slot, weight in zip(index.feed_slots[fid], index.feed_weights[fid]):
+            if as_of is None:
+                price, price_time = index.prices[slot], index.times[slot]
+                if not price_time:
+                    continue
+            else:
+                point = index.history.price_at(slot, as_of)
+                if point is None:
+                    continue
+                price, price_time = point
+
+            exchange, symbol = index.sources[slot]
+            rate = 1.0
+            if index.is_usdt[slot]:
+                rate = usdt_rate()
+                if rate is None:
+                    self.logger.warning(f"Unable to retrieve USDT to USD conversion rate for {symbol} at {exchange}")
+                    continue
+                price *= rate
 
-            price = info.value
-            if source.symbol.endswith("USDT"):
-                price = await convert_to_usd(source.symbol, source.exchange, price)
-            if price is None:
-                continue
+            prices.append(PriceInfo(value=price, time=price_time, exchange=exchange, weight=weight))
+            if use_volume:
+                volumes.append(self._rolling_volume(exchange, symbol) * rate)
 
-            prices.append(PriceInfo(value=price, time=info.time, exchange=info.exchange))
+        if not prices and as_of is not None:
+            self.logger.debug(f"No price history for {feed_id} at {as_of}, using latest prices")
+            return self._compute_feed_price(index, fid, usdt_rate, request_missing=request_missing)
 
         if not prices:
-            self.logger.warning(f"No prices found for {feed_id}")
-            asyncio.create_task(self._fetch_last_prices(config))
+            if request_missing:
+                self._on_missing_prices(index, fid)
             return None
 
-        self.logger.debug(f"Calculating results for {feed_id}")
-        return self._weighted_median(prices)
+        # Without any recent volume the sources keep their static weights
+        if use_volume and sum(volumes) > 0:
+            for price_info, volume in zip(prices, volumes):
+                price_info.weight *= volume
+        decay = decay_table(0.0) if MEDIAN_WEIGHTING == "volume" else index.feed_decay[fid]
 
-    async def _fetch_last_prices(self, config: FeedConfig):
-        feed_key = self._feed_key(config.feed)
-        if feed_key in self.fetch_attempted:
-            return
-        self.fetch_attempted.add(feed_key)
+        self.logger.debug(f"Calculating results for {feed_id}")
+        return self._weighted_median(prices, decay, as_of)
 
-        for source in config.sources:
-            exchange = self.exchange_by_name.get(source.exchange)
-            if not exchange or not exchange.markets:
-                continue
+    def _history_reaches(self, index: FeedIndex, fid: int, as_of: int) -> bool:
+        # A median of only the sources with older history left would favour quiet and stale sources,
+        # so a feed is only served as of a timestamp every one of its sources still covers
+        return all(index.history.reaches(slot, as_of) for slot in index.feed_slots[fid])
 
-            market = exchange.markets.get(source.symbol)
-            if not market:
-                continue
+    def _rolling_volume(self, exchange_name: str, symbol: str) -> float:
+        volume_store = self.volumes.get(symbol, {}).get(exchange_name)
+        return volume_store.rolling_volume() if volume_store is not None else 0.0
 
-            self.logger.info(f"Fetching last price for {market['id']} on {source.exchange}")
-            try:
-                ticker = await exchange.fetch_ticker(market['id'])
-                if not ticker or 'last' not in ticker or ticker['last'] is None:
-                    self.logger.log(f"No last price found for {market['id']} on {source.exchange}")
-                    continue
-                self._set_price(source.exchange, ticker['symbol'], ticker['last'], ticker['timestamp'])
-            except Exception as e:
-                self.logger.warning(f"Failed to fetch ticker for {market['id']} on {source.exchange}: {e}")
+    def _on_missing_prices(self, index: FeedIndex, fid: int):
+        self.logger.warning(f"No prices found for {index.configs[fid].feed}")
+        self.cold_fetcher.request(index.configs[fid].sources)
 
-    def _weighted_median(self, prices: List[PriceInfo]) -> float | None:
+    def _weighted_median(
+        self, prices: List[PriceInfo], decay: DecayTable | None = None, now: int | None = None
+    ) -> float | None:
         if not prices:
             raise ValueError("Price list cannot be empty.")
 
+        prices = filter_outliers(prices, lambda p: p.value)
         prices.sort(key=lambda p: p.time)
-        now = int(time.time() * 1000)
+        now = now if now is not None else int(time.time() * 1000)
 
-        weights = [math.exp(-LAMBDA * (now - p.time)) for p in prices]
+        decay = decay or decay_table(LAMBDA)
+        weights = [decay.weight(now - p.time) * p.weight for p in prices]
         weight_sum = sum(weights)
 
         if weight_sum == 0:
@@ -358,28 +766,122 @@ class CcxtFeed(BaseDataFeed):
         self.logger.warning("Unable to calculate weighted median")
         return None
 
-    def _feed_key(self, feed: FeedId) -> str:
-        return f"{feed.category}:{feed.name}"
-
-    def _load_config(self) -> List[FeedConfig]:
+    def _config_path(self) -> Path:
         network = os.environ.get("NETWORK", "prod")
         config_file = f"{'test-' if network == 'local-test' else ''}feeds.json"
-        config_path = Path("src") / "config" / config_file
+        return Path("src") / "config" / config_file
+
+    def _config_mtime(self) -> int | None:
+        try:
+            return os.stat(self._config_path()).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load_config(self) -> List[FeedConfig]:
+        config = self._read_config()
+        self._apply_config(config)
+        self.logger.info(f"Supported feeds: {[cfg.feed.dict() for cfg in config]}")
+        return config
 
+    def _read_config(self) -> List[FeedConfig]:
         try:
-            with open(config_path, "r") as f:
+            with open(self._config_path(), "r") as f:
                 config_data = json.load(f)
 
-            config = [FeedConfig(**item) for item in config_data]
+            # Either a plain list of feeds, or {"profiles": {<category>: profile}, "feeds": [...]}
+            profiles: Dict[str, FeedProfile] = {}
+            if isinstance(config_data, dict):
+                profiles = {name.upper(): FeedProfile(**p) for name, p in config_data.get("profiles", {}).items()}
+                config_data = config_data.get("feeds", [])
+
+            config = [self._apply_profile(FeedConfig(**item), profiles) for item in config_data]
 
             if not any(feeds_equal(cfg.feed, usdt_to_usd_feed_id) for cfg in config):
                 raise ValueError("Must provide USDT feed sources, as it is used for USD conversion.")
 
-            for cfg in config:
-                self.config_by_key[self._feed_key(cfg.feed)] = cfg
-
-            self.logger.info(f"Supported feeds: {[cfg.feed.dict() for cfg in config]}")
             return config
         except (FileNotFoundError, json.JSONDecodeError, ValueError) as e:
             self.logger.error(f"Error parsing JSON config: {e}")
-            raise e
\ No newline at end of file
+            raise e
+
+    def _apply_profile(self, cfg: FeedConfig, profiles: Dict[str, FeedProfile]) -> FeedConfig:
+        try:
+            category = FeedCategory(cfg.feed.category).name
+        except ValueError:
+            return cfg
+        profile = profiles.get(category)
+        if profile is None:
+            return cfg
+
+        if cfg.decay is None:
+            cfg.decay = profile.decay
+        cfg.weights = {**profile.weights, **cfg.weights}
+        return cfg
+
+    def _apply_config(self, config: List[FeedConfig]):
+        # The index is built aside and swapped in one step, so requests never observe a partial config
+        index = FeedIndex(config, usdt_to_usd_feed_id, LAMBDA)
+        index.copy_prices_from(self.index)
+        self.config, self.index = config, index
+
+    async def _watch_config(self):
+        self.logger.info(f"Watching {self._config_path()} for changes every {CONFIG_RELOAD_INTERVAL_MS} ms")
+        while True:
+            await sleep_for(CONFIG_RELOAD_INTERVAL_MS)
+            mtime = self._config_mtime()
+            if mtime is None or mtime == self.config_mtime:
+                continue
+            self.config_mtime = mtime
+            try:
+                await self._reload_config()
+            except Exception as e:
+                self.logger.error(f"Failed to reload feed config, keeping the current one: {as_error(e)}")
+
+    async def _reload_config(self):
+        config = self._read_config()
+        old_pairs = self._exchange_to_symbols(self.config)
+        new_pairs = self._exchange_to_symbols(config)
+
+        added = {
+            exchange: symbols - old_pairs.get(exchange, set())
+            for exchange, symbols in new_pairs.items()
+            if symbols - old_pairs.get(exchange, set())
+        }
+        removed = {
+            exchange: symbols - new_pairs.get(exchange, set())
+            for exchange, symbols in old_pairs.items()
+            if symbols - new_pairs.get(exchange, set())
+        }
+        self.logger.info(f"Feed config changed, subscribing to {added}, unsubscribing from {removed}")
+
+        # Only exchanges that are not connected yet need their markets loaded
+        await self._init_exchanges({exchange: set(symbols) for exchange, symbols in new_pairs.items()})
+
+        self._apply_config(config)
+        for exchange_name, symbols in new_pairs.items():
+            exchange = self.exchange_by_name.get(exchange_name)
+            if exchange is not None:
+                self._watch(exchange, symbols, exchange_name)
+
+        for exchange_name, symbols in removed.items():
+            for symbol in symbols:
+                self.volumes.get(symbol, {}).pop(exchange_name, None)
+            if exchange_name not in new_pairs:
+                await self._close_exchange(exchange_name)
+
+        self.logger.info(f"Supported feeds: {[cfg.feed.dict() for cfg in config]}")
+
+    async def _close_exchange(self, exchange_name: str):
+        exchange = self.exchange_by_name.pop(exchange_name, None)
+        self.scheduler.remove(exchange_name)
+        if exchange is None:
+            return
+        self._watch(exchange, set(), exchange_name)
+        self.watched_symbols.pop(exchange_name, None)
+        await self._close(exchange_name, exchange)
+
+    async def _close(self, exchange_name: str, exchange: ccxt.Exchange):
+        try:
+            await exchange.close()
+        except Exception as e:
+            self.logger.debug(f"Failed to close exchange {exchange_name}: {as_error(e)}")
@@ -0,0 +1,369 @@
+import asyncio
+import os
+import random
+import struct
+from array import array
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from loguru import logger
+
+from utils.error_utils import as_error
+from utils.retry_utils import sleep_for
+
+# "collector" ingests from exchanges and publishes to replicas, "replica" serves state received from the collector
+CLUSTER_ROLE = os.environ.get("CLUSTER_ROLE", "none").lower()
+# tcp://host:port, unix:///path/to/socket or local (in-process, for testing)
+CLUSTER_ADDRESS = os.environ.get("CLUSTER_ADDRESS", "tcp://127.0.0.1:3190")
+CLUSTER_FLUSH_MS = int(os.environ.get("CLUSTER_FLUSH_MS", 20))
+CLUSTER_HEARTBEAT_MS = int(os.environ.get("CLUSTER_HEARTBEAT_MS", 1_000))
+# Replicas take over collecting after the collector has been unreachable for this long
+CLUSTER_FAILOVER_MS = int(os.environ.get("CLUSTER_FAILOVER_MS", 15_000))
+# Replicas whose unsent data exceeds this are disconnected and resynchronize from a snapshot
+CLUSTER_MAX_BUFFER_BYTES = int(os.environ.get("CLUSTER_MAX_BUFFER_BYTES", 16 * 1024 * 1024))
+
+# Frames are a little-endian u32 length followed by a one byte type and its payload
+HELLO = b"E"  # u32 collector epoch
+SOURCE = b"S"  # u32 source id, exchange and symbol separated by a NUL byte
+PRICE = b"P"  # u32 source id, f64 price, i64 timestamp
+TRADES = b"T"  # u32 source id, u16 count, count * (i64 timestamp, f64 price, f64 amount, u64 sequence)
+VOLUMES = b"V"  # u32 source id, i64 last trade timestamp, f64 volume per second of the whole VolumeStore history
+HEARTBEAT = b"H"
+
+LENGTH = struct.Struct("<I")
+U32 = struct.Struct("<I")
+PRICE_PAYLOAD = struct.Struct("<Idq")
+TRADES_HEADER = struct.Struct("<IH")
+TRADE = struct.Struct("<qddQ")
+VOLUMES_HEADER = struct.Struct("<Iq")
+MAX_TRADES_PER_FRAME = 0xFFFF
+READ_CHUNK_BYTES = 256 * 1024
+
+Connection = Tuple[asyncio.StreamReader, Any]
+
+
+def encode_frame(kind: bytes, payload: bytes = b"") -> bytes:
+    return LENGTH.pack(len(payload) + 1) + kind + payload
+
+
+def decode_frame(body: bytes) -> Tuple[bytes, Any]:
+    kind, payload = body[:1], memoryview(body)[1:]
+    if kind == PRICE:
+        return kind, PRICE_PAYLOAD.unpack(payload)
+    if kind == TRADES:
+        source_id, count = TRADES_HEADER.unpack_from(payload)
+        return kind, (source_id, list(TRADE.iter_unpack(payload[TRADES_HEADER.size:TRADES_HEADER.size + count * TRADE.size])))
+    if kind == SOURCE:
+        (source_id,) = U32.unpack_from(payload)
+        exchange, symbol = bytes(payload[U32.size:]).decode().split("\0")
+        return kind, (source_id, exchange, symbol)
+    if kind == VOLUMES:
+        source_id, last_ts = VOLUMES_HEADER.unpack_from(payload)
+        volume_sec = array("d")
+        volume_sec.frombytes(payload[VOLUMES_HEADER.size:])
+        return kind, (source_id, last_ts, volume_sec)
+    if kind == HELLO:
+        return kind, U32.unpack(payload)[0]
+    return kind, None
+
+
+class FrameDecoder:
+    """Splits received bytes into frame bodies, keeping incomplete frames until the rest arrives."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[bytes]:
+        self.buffer += data
+        frames = []
+        offset = 0
+        while len(self.buffer) - offset >= LENGTH.size:
+            (length,) = LENGTH.unpack_from(self.buffer, offset)
+            end = offset + LENGTH.size + length
+            if end > len(self.buffer):
+                break
+            frames.append(bytes(self.buffer[offset + LENGTH.size:end]))
+            offset = end
+        del self.buffer[:offset]
+        return frames
+
+
+async def read_frames(reader: asyncio.StreamReader, decoder: FrameDecoder, timeout_sec: float) -> List[bytes]:
+    """Waits for the next received data and returns the frames it completes. Reading whole chunks
+    instead of single frames keeps replicas up with bursts of small deltas."""
+    data = await asyncio.wait_for(reader.read(READ_CHUNK_BYTES), timeout_sec)
+    if not data:
+        raise asyncio.IncompleteReadError(bytes(decoder.buffer), None)
+    return decoder.feed(data)
+
+
+class StreamTransport:
+    """Collector to replica connections over TCP or a unix domain socket."""
+
+    def __init__(self, address: str):
+        self.address = address
+        self.server: asyncio.AbstractServer | None = None
+
+    async def serve(self, on_connect: Callable[[asyncio.StreamReader, Any], Awaitable[None]]):
+        if self.address.startswith("unix://"):
+            path = self.address[len("unix://"):]
+            await self._remove_stale_socket(path)
+            self.server = await asyncio.start_unix_server(on_connect, path)
+        else:
+            host, port = self._host_port()
+            self.server = await asyncio.start_server(on_connect, host, port)
+
+    async def connect(self) -> Connection:
+        if self.address.startswith("unix://"):
+            return await asyncio.open_unix_connection(self.address[len("unix://"):])
+        return await asyncio.open_connection(*self._host_port())
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+
+    def _host_port(self) -> Tuple[str, int]:
+        host, port = self.address.removeprefix("tcp://").rsplit(":", 1)
+        return host, int(port)
+
+    async def _remove_stale_socket(self, path: str):
+        # A socket file left behind by a dead collector refuses connections and would block binding
+        if not os.path.exists(path):
+            return
+        try:
+            _, writer = await asyncio.open_unix_connection(path)
+        except OSError:
+            os.unlink(path)
+            return
+        writer.close()
+        raise OSError(f"Collector already listening on {path}")
+
+
+class LocalWriter:
+    """Writer side of an in-process connection, feeding a peer StreamReader."""
+
+    transport = None
+
+    def __init__(self, peer: asyncio.StreamReader):
+        self.peer = peer
+        self.closed = False
+
+    def write(self, data: bytes):
+        if not self.closed:
+            self.peer.feed_data(data)
+
+    async def drain(self):
+        pass
+
+    def is_closing(self) -> bool:
+        return self.closed
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.peer.feed_eof()
+
+
+class LocalTransport:
+    """In-process stand-in for StreamTransport, connecting a collector and replicas in one process."""
+
+    def __init__(self):
+        self.on_connect: Callable[[asyncio.StreamReader, Any], Awaitable[None]] | None = None
+        self.writers: List[LocalWriter] = []
+
+    async def serve(self, on_connect: Callable[[asyncio.StreamReader, Any], Awaitable[None]]):
+        if self.on_connect is not None:
+            raise OSError("Local collector already serving")
+        self.on_connect = on_connect
+
+    async def connect(self) -> Connection:
+        if self.on_connect is None:
+            raise ConnectionRefusedError("No local collector")
+        client_reader, server_reader = asyncio.StreamReader(), asyncio.StreamReader()
+        client_writer, server_writer = LocalWriter(server_reader), LocalWriter(client_reader)
+        self.writers += [client_writer, server_writer]
+        asyncio.create_task(self.on_connect(server_reader, server_writer))
+        return client_reader, client_writer
+
+    async def close(self):
+        """Simulates the collector going away."""
+        self.on_connect = None
+        for writer in self.writers:
+            writer.close()
+        self.writers = []
+
+
+local_transport = LocalTransport()
+
+
+def cluster_transport(address: str = CLUSTER_ADDRESS):
+    return local_transport if address == "local" else StreamTransport(address)
+
+
+class ClusterPublisher:
+    """
+    Publishes price and trade deltas of a collector to connected replicas.
+
+    Deltas are appended to a shared buffer and written to all replicas every CLUSTER_FLUSH_MS.
+    Sources are announced once with a numeric id, later frames only carry the id. A new replica first
+    receives a snapshot of all latest prices and volume histories, so it is in sync when deltas follow.
+    """
+
+    def __init__(self, transport, feed: Any):
+        self.logger = logger
+        self.transport = transport
+        self.feed = feed
+        # Distinguishes trade sequence numbers of different collectors, e.g. after a failover
+        self.epoch = random.getrandbits(32)
+        self.sequence = 0
+        self.source_ids: Dict[Tuple[str, str], int] = {}
+        self.buffer = bytearray()
+        self.subscribers: List[Any] = []
+        self.flush_task: asyncio.Task | None = None
+
+    async def start(self):
+        await self.transport.serve(self._on_connect)
+        self.logger.info(f"Publishing price updates to replicas at {CLUSTER_ADDRESS}")
+        self.flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+        self._flush()
+        await self.transport.close()
+        for writer in self.subscribers:
+            writer.close()
+        self.subscribers = []
+
+    def price(self, exchange: str, symbol: str, price: float, timestamp: int):
+        source_id = self._source_id(exchange, symbol)
+        if self.subscribers:
+            self.buffer += encode_frame(PRICE, PRICE_PAYLOAD.pack(source_id, price, timestamp))
+
+    def trades(self, exchange: str, symbol: str, trades: List[Tuple[int, float, float]]):
+        source_id = self._source_id(exchange, symbol)
+        first_sequence = self.sequence
+        self.sequence += len(trades)
+        if not self.subscribers:
+            return
+        for start in range(0, len(trades), MAX_TRADES_PER_FRAME):
+            chunk = trades[start:start + MAX_TRADES_PER_FRAME]
+            payload = bytearray(TRADES_HEADER.pack(source_id, len(chunk)))
+            for i, (timestamp, price, amount) in enumerate(chunk):
+                payload += TRADE.pack(timestamp, price, amount, first_sequence + start + i)
+            self.buffer += encode_frame(TRADES, bytes(payload))
+
+    def _source_id(self, exchange: str, symbol: str) -> int:
+        source_id = self.source_ids.get((exchange, symbol))
+        if source_id is None:
+            source_id = self.source_ids[(exchange, symbol)] = len(self.source_ids)
+            if self.subscribers:
+                self.buffer += self._source_frame(source_id, exchange, symbol)
+        return source_id
+
+    def _source_frame(self, source_id: int, exchange: str, symbol: str) -> bytes:
+        return encode_frame(SOURCE, U32.pack(source_id) + f"{exchange}\0{symbol}".encode())
+
+    def snapshot(self) -> bytes:
+        """Frames recreating the latest prices and volume histories of the feed, as sent to new replicas."""
+        index = self.feed.index
+        frames = [encode_frame(HELLO, U32.pack(self.epoch))]
+        for slot, (exchange, symbol) in enumerate(index.sources):
+            if index.times[slot]:
+                self._source_id(exchange, symbol)
+        for symbol, stores in self.feed.volumes.items():
+            for exchange in stores:
+                self._source_id(exchange, symbol)
+        frames += [self._source_frame(source_id, *source) for source, source_id in self.source_ids.items()]
+
+        for slot, (exchange, symbol) in enumerate(index.sources):
+            if index.times[slot]:
+                frames.append(
+                    encode_frame(PRICE, PRICE_PAYLOAD.pack(self.source_ids[(exchange, symbol)], index.prices[slot], index.times[slot]))
+                )
+        for symbol, stores in self.feed.volumes.items():
+            for exchange, store in stores.items():
+                if store.last_ts:
+                    header = VOLUMES_HEADER.pack(self.source_ids[(exchange, symbol)], store.last_ts)
+                    frames.append(encode_frame(VOLUMES, header + store.volume_sec.tobytes()))
+        return b"".join(frames)
+
+    async def _on_connect(self, reader: asyncio.StreamReader, writer: Any):
+        # Pending deltas go out first, so they are not applied on top of the snapshot containing them
+        self._flush()
+        writer.write(self.snapshot())
+        self.subscribers.append(writer)
+        self.logger.info(f"Replica connected, {len(self.subscribers)} connected")
+        try:
+            # Replicas do not send anything, this returns once the connection is closed
+            await reader.read()
+        except Exception as e:
+            self.logger.debug(f"Replica connection failed: {as_error(e)}")
+        finally:
+            if writer in self.subscribers:
+                self.subscribers.remove(writer)
+            writer.close()
+            self.logger.info(f"Replica disconnected, {len(self.subscribers)} connected")
+
+    async def _flush_loop(self):
+        idle_ms = 0
+        while True:
+            await sleep_for(CLUSTER_FLUSH_MS)
+            idle_ms += CLUSTER_FLUSH_MS
+            if not self.buffer and idle_ms >= CLUSTER_HEARTBEAT_MS:
+                self.buffer += encode_frame(HEARTBEAT)
+            if self.buffer:
+                idle_ms = 0
+                self._flush()
+
+    def _flush(self):
+        if not self.buffer:
+            return
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        for writer in list(self.subscribers):
+            transport = writer.transport
+            if writer.is_closing() or (transport is not None and transport.get_write_buffer_size() > CLUSTER_MAX_BUFFER_BYTES):
+                self.logger.warning("Disconnecting replica that is not keeping up")
+                self.subscribers.remove(writer)
+                writer.close()
+                continue
+            writer.write(data)
+
+
+class FrameApplier:
+    """
+    Applies received frames to a feed through its price table and VolumeStores, the same code paths
+    as local updates. Source ids are resolved with the SOURCE frames received since the last HELLO.
+    """
+
+    def __init__(self, feed: Any):
+        self.feed = feed
+        self.epoch = 0
+        self.source_names: Dict[int, Tuple[str, str]] = {}
+
+    def apply(self, body: bytes):
+        kind, data = decode_frame(body)
+        if kind == PRICE:
+            source_id, price, timestamp = data
+            source = self.source_names.get(source_id)
+            if source is not None:
+                self.feed._set_price(*source, price, timestamp)
+        elif kind == TRADES:
+            source_id, trades = data
+            source = self.source_names.get(source_id)
+            if source is not None:
+                # Sequence numbers are unique per collector epoch, so replayed trades are deduplicated
+                self.feed._volume_store(*source).process_lean_trades(
+                    [(timestamp, price, amount, (self.epoch, sequence)) for timestamp, price, amount, sequence in trades]
+                )
+        elif kind == SOURCE:
+            source_id, exchange, symbol = data
+            self.source_names[source_id] = (exchange, symbol)
+        elif kind == VOLUMES:
+            source_id, last_ts, volume_sec = data
+            source = self.source_names.get(source_id)
+            if source is not None:
+                self.feed._volume_store(*source).restore(last_ts, volume_sec)
+        elif kind == HELLO:
+            self.epoch = data
+            self.source_names = {}
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import time
+from typing import Any, Callable, Coroutine, Dict, Iterable, List, Set, Tuple
+from loguru import logger
+
+from data_feeds.request_scheduler import Priority, RequestScheduler
+from utils.error_utils import as_error
+from utils.retry_utils import sleep_for
+
+# Maximum number of ticker requests in flight across all exchanges
+COLD_FETCH_CONCURRENCY = int(os.environ.get("COLD_FETCH_CONCURRENCY", 8))
+# Minimum interval between cold fetches of the same source
+COLD_FETCH_RETRY_MS = int(os.environ.get("COLD_FETCH_RETRY_MS", 5_000))
+# Requests arriving within this delay are merged into one batch per exchange
+COLD_FETCH_BATCH_DELAY_MS = int(os.environ.get("COLD_FETCH_BATCH_DELAY_MS", 50))
+
+
+class ColdFetcher:
+    """
+    Fetches last prices from tickers for sources that have no price yet.
+
+    Requests are deduplicated per (exchange, symbol) and batched per exchange, using fetch_tickers
+    where the exchange supports it. A source is fetched at most once per COLD_FETCH_RETRY_MS, so
+    a feed that stays dark is retried on subsequent requests instead of only once per process.
+    """
+
+    def __init__(
+        self,
+        exchange_by_name: Dict[str, Any],
+        set_price: Callable[[str, str, float, int | None], None],
+        scheduler: RequestScheduler,
+        spawn: Callable[[Coroutine], Any] = asyncio.create_task,
+    ):
+        self.logger = logger
+        self.spawn = spawn
+        self.exchange_by_name = exchange_by_name
+        self.scheduler = scheduler
+        self.set_price = set_price
+        self.semaphore: asyncio.Semaphore | None = None
+        # Loop the exchanges run on, requests from other threads are handed over to it
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.pending: Dict[str, Set[str]] = {}
+        self.next_attempt: Dict[Tuple[str, str], float] = {}
+
+    def request(self, sources: Iterable[Any]):
+        if self.loop is not None and _running_loop() is not self.loop:
+            self.loop.call_soon_threadsafe(self.request, list(sources))
+            return
+
+        now = time.monotonic()
+        for source in sources:
+            key = (source.exchange, source.symbol)
+            if self.next_attempt.get(key, 0) > now:
+                continue
+            self.next_attempt[key] = now + COLD_FETCH_RETRY_MS / 1000
+
+            pending = self.pending.get(source.exchange)
+            if pending is None:
+                pending = self.pending[source.exchange] = set()
+                self.spawn(self._flush(source.exchange))
+            pending.add(source.symbol)
+
+    async def _flush(self, exchange_name: str):
+        await sleep_for(COLD_FETCH_BATCH_DELAY_MS)
+        symbols = self.pending.pop(exchange_name, set())
+
+        exchange = self.exchange_by_name.get(exchange_name)
+        if not exchange or not exchange.markets:
+            return
+        symbols = [symbol for symbol in symbols if symbol in exchange.markets]
+        if not symbols:
+            return
+
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(COLD_FETCH_CONCURRENCY)
+
+        if len(symbols) > 1 and exchange.has.get("fetchTickers"):
+            await self._fetch_tickers(exchange, exchange_name, symbols)
+        else:
+            await asyncio.gather(*[self._fetch_ticker(exchange, exchange_name, symbol) for symbol in symbols])
+
+    async def _fetch_tickers(self, exchange: Any, exchange_name: str, symbols: List[str]):
+        self.logger.info(f"Fetching last prices for {symbols} on {exchange_name}")
+        try:
+            async with self.semaphore:
+                tickers = await self.scheduler.for_exchange(exchange_name, exchange).run(
+                    Priority.COLD_FETCH, lambda: exchange.fetch_tickers(symbols), max_retries=1
+                )
+        except Exception as e:
+            self.logger.warning(f"Failed to fetch tickers for {symbols} on {exchange_name}: {as_error(e)}")
+            return
+
+        for symbol in symbols:
+            self._apply_ticker(exchange_name, symbol, tickers.get(symbol))
+
+    async def _fetch_ticker(self, exchange: Any, exchange_name: str, symbol: str):
+        self.logger.info(f"Fetching last price for {symbol} on {exchange_name}")
+        try:
+            async with self.semaphore:
+                ticker = await self.scheduler.for_exchange(exchange_name, exchange).run(
+                    Priority.COLD_FETCH, lambda: exchange.fetch_ticker(symbol), max_retries=1
+                )
+        except Exception as e:
+            self.logger.warning(f"Failed to fetch ticker for {symbol} on {exchange_name}: {as_error(e)}")
+            return
+
+        self._apply_ticker(exchange_name, symbol, ticker)
+
+    def _apply_ticker(self, exchange_name: str, symbol: str, ticker: Dict | None):
+        if not ticker or ticker.get("last") is None:
+            self.logger.info(f"No last price found for {symbol} on {exchange_name}")
+            return
+        self.set_price(exchange_name, symbol, ticker["last"], ticker.get("timestamp"))
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
@@ -0,0 +1,118 @@
+import threading
+from array import array
+from typing import List, Dict, Tuple, Any, Set
+
+from data_feeds.price_history import PriceHistory
+from data_feeds.weights import DecayTable, decay_table
+from dto.provider_requests import FeedId
+
+
+class FeedIndex:
+    """
+    Compiled view of the feed config used on the request path.
+
+    Every feed gets an integer id and every distinct (exchange, symbol) source gets a slot in flat
+    price and time arrays. Slots are laid out in feed order, so the sources of a feed are mostly
+    contiguous. A time of 0 means no price has been seen for the slot yet. Recent prices of every
+    slot are also kept in a PriceHistory for point-in-time queries.
+
+    Decay curves and static exchange weights are resolved per feed here, so computing a median
+    only needs table lookups.
+
+    Computed feed values are cached in `values`. Each slot maps to the feeds depending on it, and a
+    price update marks those feeds dirty until their value is recomputed. Prices may be set from the
+    ingestion thread while requests are served on the main loop, so the dirty set and cached values
+    are only updated while holding `lock`.
+    """
+
+    def __init__(self, config: List[Any], usdt_feed: FeedId, default_decay: float):
+        self.configs = config
+        self.feed_ids: Dict[Tuple[int, str], int] = {}
+        self.slot_by_source: Dict[Tuple[str, str], int] = {}
+        self.sources: List[Tuple[str, str]] = []
+        self.feed_slots: List[Tuple[int, ...]] = []
+        self.feed_weights: List[Tuple[float, ...]] = []
+        self.feed_decay: List[DecayTable] = []
+
+        for feed_id, cfg in enumerate(config):
+            self.feed_ids[(cfg.feed.category, cfg.feed.name)] = feed_id
+            slots = []
+            for source in cfg.sources:
+                key = (source.exchange, source.symbol)
+                slot = self.slot_by_source.get(key)
+                if slot is None:
+                    slot = len(self.sources)
+                    self.slot_by_source[key] = slot
+                    self.sources.append(key)
+                slots.append(slot)
+            self.feed_slots.append(tuple(slots))
+            self.feed_weights.append(tuple(cfg.weights.get(source.exchange, 1.0) for source in cfg.sources))
+            self.feed_decay.append(decay_table(cfg.decay if cfg.decay is not None else default_decay))
+
+        self.is_usdt = [symbol.endswith("USDT") for _, symbol in self.sources]
+        self.prices = array("d", [0.0]) * len(self.sources)
+        self.times = array("q", [0]) * len(self.sources)
+        self.history = PriceHistory(len(self.sources))
+        self.usdt_feed_id = self.feed_ids.get((usdt_feed.category, usdt_feed.name))
+
+        # A USDT/USD price change also affects every feed with USDT-quoted sources
+        slot_feeds: List[Set[int]] = [set() for _ in self.sources]
+        for feed_id, slots in enumerate(self.feed_slots):
+            for slot in slots:
+                slot_feeds[slot].add(feed_id)
+        if self.usdt_feed_id is not None:
+            usdt_dependents = {
+                feed_id for feed_id, slots in enumerate(self.feed_slots) if any(self.is_usdt[slot] for slot in slots)
+            }
+            for slot in self.feed_slots[self.usdt_feed_id]:
+                slot_feeds[slot] |= usdt_dependents
+        self.slot_feeds: List[Tuple[int, ...]] = [tuple(sorted(feeds)) for feeds in slot_feeds]
+
+        self.values: List[float | None] = [None] * len(config)
+        self.value_times = array("q", [0]) * len(config)
+        self.dirty: Set[int] = set(range(len(config)))
+        self.lock = threading.Lock()
+
+    def feed_id(self, feed: FeedId) -> int | None:
+        return self.feed_ids.get((feed.category, feed.name))
+
+    def set_price(self, exchange: str, symbol: str, price: float, timestamp: int) -> bool:
+        slot = self.slot_by_source.get((exchange, symbol))
+        if slot is None:
+            return False
+        with self.lock:
+            self.prices[slot] = price
+            self.times[slot] = timestamp
+            self.history.append(slot, timestamp, price)
+            self.dirty.update(self.slot_feeds[slot])
+        return True
+
+    def take_stale(self, fid: int, now: int, max_age_ms: int) -> bool:
+        """
+        Returns whether the cached value of a feed needs recomputing, because it is dirty or older
+        than `max_age_ms`. The feed is marked clean before it is computed, so updates arriving
+        meanwhile mark it dirty again.
+        """
+        with self.lock:
+            if fid not in self.dirty and now - self.value_times[fid] <= max_age_ms:
+                return False
+            self.dirty.discard(fid)
+            self.value_times[fid] = now
+            return True
+
+    def set_value(self, fid: int, value: float | None):
+        with self.lock:
+            self.values[fid] = value
+
+    def price_time(self, exchange: str, symbol: str) -> int:
+        slot = self.slot_by_source.get((exchange, symbol))
+        return self.times[slot] if slot is not None else 0
+
+    def copy_prices_from(self, other: "FeedIndex"):
+        """Carries over the latest prices and price history of sources present in both indexes."""
+        for slot, source in enumerate(self.sources):
+            old_slot = other.slot_by_source.get(source)
+            if old_slot is not None:
+                self.prices[slot] = other.prices[old_slot]
+                self.times[slot] = other.times[old_slot]
+                self.history.copy_slot(other.history, old_slot, slot)
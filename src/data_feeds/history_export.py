@@ -0,0 +1,131 @@
+import asyncio
+import struct
+from array import array
+from typing import AsyncIterator, Iterator
+
+from data_feeds.base_feed import PriceSeries, VolumeHistory
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+BINARY_MEDIA_TYPE = "application/octet-stream"
+EXPORT_FORMATS = ("arrow", "binary")
+
+# Binary records start with a one byte kind and the exchange and symbol, UTF-8 with u16 lengths, followed by
+#   b"V": i64 start second, u32 count, count * f64 volume of consecutive seconds
+#   b"P": u32 count, count * i64 time in ms, count * f64 price
+# All values are little-endian.
+RECORD_HEADER = struct.Struct("<cHH")
+VOLUME_HEADER = struct.Struct("<qI")
+PRICE_HEADER = struct.Struct("<I")
+# Arrow IPC end-of-stream marker: continuation token followed by a zero length
+ARROW_EOS = b"\xff\xff\xff\xff\x00\x00\x00\x00"
+
+Chunk = bytes | memoryview
+
+
+def default_format() -> str:
+    return "arrow" if pa is not None else "binary"
+
+
+def media_type(fmt: str) -> str:
+    return ARROW_MEDIA_TYPE if fmt == "arrow" else BINARY_MEDIA_TYPE
+
+
+def check_format(fmt: str):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt}, expected one of {EXPORT_FORMATS}")
+    if fmt == "arrow" and pa is None:
+        raise ValueError("Arrow export requires pyarrow to be installed")
+
+
+async def stream_volumes(histories: Iterator[VolumeHistory], fmt: str) -> AsyncIterator[Chunk]:
+    """
+    Streams volume histories one source at a time. Each record or record batch is copied out of the
+    live VolumeStore buffers in one step, without awaiting in between, so trades arriving while it is
+    sent cannot tear it. The event loop is yielded to after every source, so a large export does not
+    hold up trade ingestion or other requests.
+    """
+    if fmt == "arrow":
+        schema = pa.schema([("exchange", pa.string()), ("symbol", pa.string()), ("time", pa.timestamp("s")), ("volume", pa.float64())])
+        yield memoryview(schema.serialize())
+    for history in histories:
+        if fmt == "arrow":
+            start_sec = history.start_sec
+            batches = []
+            for volumes in history.volumes:
+                seconds = array("q", range(start_sec, start_sec + len(volumes)))
+                batch = pa.RecordBatch.from_arrays(
+                    [
+                        _repeat(history.exchange, len(volumes)),
+                        _repeat(history.symbol, len(volumes)),
+                        _column(pa.timestamp("s"), memoryview(seconds)),
+                        _column(pa.float64(), volumes),
+                    ],
+                    schema=schema,
+                )
+                batches.append(memoryview(batch.serialize()))
+                start_sec += len(volumes)
+            # Serialized before yielding, the buffers may change while earlier batches are sent
+            for batch in batches:
+                yield batch
+        else:
+            record = bytearray(_record_header(b"V", history.exchange, history.symbol))
+            record += VOLUME_HEADER.pack(history.start_sec, sum(len(v) for v in history.volumes))
+            for volumes in history.volumes:
+                record += volumes
+            yield bytes(record)
+        await asyncio.sleep(0)
+    if fmt == "arrow":
+        yield ARROW_EOS
+
+
+async def stream_prices(series: Iterator[PriceSeries], fmt: str) -> AsyncIterator[Chunk]:
+    """Streams recent price histories one source at a time, the same way as `stream_volumes`."""
+    if fmt == "arrow":
+        schema = pa.schema([("exchange", pa.string()), ("symbol", pa.string()), ("time", pa.timestamp("ms")), ("price", pa.float64())])
+        yield memoryview(schema.serialize())
+    for source in series:
+        if fmt == "arrow":
+            batches = []
+            for times, prices in zip(source.times, source.prices):
+                batch = pa.RecordBatch.from_arrays(
+                    [
+                        _repeat(source.exchange, len(times)),
+                        _repeat(source.symbol, len(times)),
+                        _column(pa.timestamp("ms"), times),
+                        _column(pa.float64(), prices),
+                    ],
+                    schema=schema,
+                )
+                batches.append(memoryview(batch.serialize()))
+            for batch in batches:
+                yield batch
+        else:
+            record = bytearray(_record_header(b"P", source.exchange, source.symbol))
+            record += PRICE_HEADER.pack(sum(len(t) for t in source.times))
+            for times in source.times:
+                record += times
+            for prices in source.prices:
+                record += prices
+            yield bytes(record)
+        await asyncio.sleep(0)
+    if fmt == "arrow":
+        yield ARROW_EOS
+
+
+def _record_header(kind: bytes, exchange: str, symbol: str) -> bytes:
+    exchange_bytes, symbol_bytes = exchange.encode(), symbol.encode()
+    return RECORD_HEADER.pack(kind, len(exchange_bytes), len(symbol_bytes)) + exchange_bytes + symbol_bytes
+
+
+def _column(type, view: memoryview):
+    # Wraps the buffer without copying, the record batch is serialized (copied) before the buffer can change
+    return pa.Array.from_buffers(type, len(view), [None, pa.py_buffer(view)])
+
+
+def _repeat(value: str, count: int):
+    return pa.repeat(pa.scalar(value, pa.string()), count)
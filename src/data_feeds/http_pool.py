@@ -0,0 +1,102 @@
+import os
+import socket
+import ssl
+import time
+from typing import Dict
+import aiohttp
+import certifi
+from loguru import logger
+
+from utils.retry_utils import sleep_for
+
+# Connections open at once across all exchanges and per exchange host, 0 means unlimited.
+# Websocket streams on the shared session hold a connection for their whole lifetime.
+HTTP_POOL_LIMIT = int(os.environ.get("HTTP_POOL_LIMIT", 256))
+HTTP_POOL_LIMIT_PER_HOST = int(os.environ.get("HTTP_POOL_LIMIT_PER_HOST", 32))
+# Idle time after which a pooled connection is closed
+HTTP_KEEPALIVE_SEC = float(os.environ.get("HTTP_KEEPALIVE_SEC", 60))
+HTTP_DNS_TTL_SEC = int(os.environ.get("HTTP_DNS_TTL_SEC", 300))
+HTTP_POOL_STATS_INTERVAL_MS = int(os.environ.get("HTTP_POOL_STATS_INTERVAL_MS", 300_000))
+
+
+class HttpPool:
+    """
+    aiohttp session shared by all exchanges, so REST calls reuse warm TLS connections and cached DNS
+    lookups instead of each exchange keeping a default pool of its own. Connection reuse, DNS cache
+    and request counters are collected through an aiohttp TraceConfig.
+    """
+
+    def __init__(self):
+        self.logger = logger
+        self.session: aiohttp.ClientSession | None = None
+        self.counters: Dict[str, int] = {
+            "requests": 0,
+            "request_errors": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0,
+        }
+        self.connect_time_ms = 0.0
+
+    def open(self) -> aiohttp.ClientSession:
+        """Creates the session on the running event loop, if not created yet."""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                ssl=ssl.create_default_context(cafile=certifi.where()),
+                limit=HTTP_POOL_LIMIT,
+                limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                keepalive_timeout=HTTP_KEEPALIVE_SEC,
+                use_dns_cache=True,
+                ttl_dns_cache=HTTP_DNS_TTL_SEC,
+                enable_cleanup_closed=True,
+                family=socket.AF_UNSPEC,
+            )
+            self.session = aiohttp.ClientSession(connector=connector, trace_configs=[self._trace_config()])
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def metrics(self) -> Dict[str, float]:
+        metrics: Dict[str, float] = dict(self.counters)
+        created = self.counters["connections_created"]
+        metrics["avg_connect_ms"] = round(self.connect_time_ms / created, 1) if created else 0.0
+        connector = self.session.connector if self.session is not None else None
+        # Connections currently checked out of the pool, including websocket streams
+        metrics["connections_in_use"] = sum(len(c) for c in getattr(connector, "_acquired_per_host", {}).values())
+        return metrics
+
+    async def log_metrics(self):
+        while True:
+            await sleep_for(HTTP_POOL_STATS_INTERVAL_MS)
+            self.logger.info(f"HTTP pool: {self.metrics()}")
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        def count(name: str):
+            async def handler(session, context, params):
+                self.counters[name] += 1
+
+            return handler
+
+        async def on_connection_create_start(session, context, params):
+            context.connect_started = time.perf_counter()
+
+        async def on_connection_create_end(session, context, params):
+            self.counters["connections_created"] += 1
+            started = getattr(context, "connect_started", None)
+            if started is not None:
+                self.connect_time_ms += (time.perf_counter() - started) * 1000
+
+        trace_config.on_request_start.append(count("requests"))
+        trace_config.on_request_exception.append(count("request_errors"))
+        trace_config.on_connection_create_start.append(on_connection_create_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(count("connections_reused"))
+        trace_config.on_dns_cache_hit.append(count("dns_cache_hits"))
+        trace_config.on_dns_cache_miss.append(count("dns_cache_misses"))
+        return trace_config
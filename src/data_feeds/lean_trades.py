@@ -0,0 +1,175 @@
+import asyncio
+import contextlib
+import json
+import os
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+import aiohttp
+from loguru import logger
+
+from utils.error_utils import as_error
+from utils.retry_utils import sleep_for
+
+# Exchanges whose trades are parsed from raw websocket messages instead of going through ccxt
+LEAN_INGESTION_EXCHANGES = {
+    name.strip() for name in os.environ.get("LEAN_INGESTION_EXCHANGES", "").split(",") if name.strip()
+}
+# Consecutive connection failures after which an exchange falls back to ccxt
+LEAN_MAX_FAILURES = int(os.environ.get("LEAN_MAX_FAILURES", 5))
+LEAN_RECONNECT_DELAY_MS = 5_000
+
+# (timestamp ms, price, amount, trade id)
+LeanTrade = Tuple[int, float, float, Any]
+
+
+class LeanTradeAdapter:
+    """Builds subscriptions and parses raw trade messages of one exchange into compact tuples."""
+
+    ping_interval_sec: float | None = None
+
+    def url(self, market_ids: List[str]) -> str:
+        raise NotImplementedError
+
+    def subscriptions(self, market_ids: List[str]) -> List[Dict]:
+        return []
+
+    def ping_message(self) -> str | None:
+        return None
+
+    def parse(self, message: Dict) -> Iterable[Tuple[str, List[LeanTrade]]]:
+        """Yields (market id, trades) pairs found in a message."""
+        raise NotImplementedError
+
+
+class BinanceAdapter(LeanTradeAdapter):
+    def url(self, market_ids: List[str]) -> str:
+        streams = "/".join(f"{market_id.lower()}@trade" for market_id in market_ids)
+        return f"wss://stream.binance.com:9443/stream?streams={streams}"
+
+    def parse(self, message: Dict) -> Iterable[Tuple[str, List[LeanTrade]]]:
+        data = message.get("data")
+        if data and data.get("e") == "trade":
+            yield data["s"], [(data["T"], float(data["p"]), float(data["q"]), data.get("t"))]
+
+
+class BybitAdapter(LeanTradeAdapter):
+    ping_interval_sec = 20
+    # Bybit accepts at most 10 topics per subscribe request
+    max_topics_per_request = 10
+
+    def url(self, market_ids: List[str]) -> str:
+        return "wss://stream.bybit.com/v5/public/spot"
+
+    def subscriptions(self, market_ids: List[str]) -> List[Dict]:
+        topics = [f"publicTrade.{market_id}" for market_id in market_ids]
+        return [
+            {"op": "subscribe", "args": topics[i:i + self.max_topics_per_request]}
+            for i in range(0, len(topics), self.max_topics_per_request)
+        ]
+
+    def ping_message(self) -> str | None:
+        return json.dumps({"op": "ping"})
+
+    def parse(self, message: Dict) -> Iterable[Tuple[str, List[LeanTrade]]]:
+        topic = message.get("topic")
+        if topic and topic.startswith("publicTrade."):
+            trades = [(t["T"], float(t["p"]), float(t["v"]), t.get("i")) for t in message.get("data", [])]
+            yield topic[len("publicTrade."):], trades
+
+
+class OkxAdapter(LeanTradeAdapter):
+    ping_interval_sec = 25
+
+    def url(self, market_ids: List[str]) -> str:
+        return "wss://ws.okx.com:8443/ws/v5/public"
+
+    def subscriptions(self, market_ids: List[str]) -> List[Dict]:
+        return [{"op": "subscribe", "args": [{"channel": "trades", "instId": market_id} for market_id in market_ids]}]
+
+    def ping_message(self) -> str | None:
+        return "ping"
+
+    def parse(self, message: Dict) -> Iterable[Tuple[str, List[LeanTrade]]]:
+        arg = message.get("arg")
+        if arg and arg.get("channel") == "trades" and "data" in message:
+            trades = [(int(t["ts"]), float(t["px"]), float(t["sz"]), t.get("tradeId")) for t in message["data"]]
+            yield arg["instId"], trades
+
+
+LEAN_ADAPTERS: Dict[str, Callable[[], LeanTradeAdapter]] = {
+    "binance": BinanceAdapter,
+    "bybit": BybitAdapter,
+    "okx": OkxAdapter,
+}
+
+
+def lean_adapter_for(exchange_name: str) -> LeanTradeAdapter | None:
+    if exchange_name not in LEAN_INGESTION_EXCHANGES:
+        return None
+    factory = LEAN_ADAPTERS.get(exchange_name)
+    if factory is None:
+        logger.warning(f"No lean trade adapter for {exchange_name}, using ccxt")
+        return None
+    return factory()
+
+
+async def watch_lean_trades(
+    exchange_name: str,
+    adapter: LeanTradeAdapter,
+    symbol_by_market_id: Dict[str, str],
+    on_trades: Callable[[str, str, List[LeanTrade]], None],
+    session: aiohttp.ClientSession | None = None,
+):
+    """
+    Streams trades for the given markets, calling `on_trades` with time-ordered trades per symbol.
+    Connects through `session` if given, otherwise through a session of its own.
+    Returns once the connection failed LEAN_MAX_FAILURES times in a row.
+    """
+    market_ids = list(symbol_by_market_id.keys())
+    failures = 0
+    while failures < LEAN_MAX_FAILURES:
+        try:
+            async with contextlib.AsyncExitStack() as stack:
+                ws_session = session
+                if ws_session is None:
+                    ws_session = await stack.enter_async_context(aiohttp.ClientSession())
+                ws = await stack.enter_async_context(ws_session.ws_connect(adapter.url(market_ids), heartbeat=30))
+                for subscription in adapter.subscriptions(market_ids):
+                    await ws.send_str(json.dumps(subscription))
+                failures = 0
+                ping_task = asyncio.create_task(_ping(ws, adapter)) if adapter.ping_interval_sec else None
+                try:
+                    await _read_trades(ws, exchange_name, adapter, symbol_by_market_id, on_trades)
+                finally:
+                    if ping_task is not None:
+                        ping_task.cancel()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"Lean trade stream for {exchange_name} failed: {as_error(e)}, will retry")
+        failures += 1
+        await sleep_for(LEAN_RECONNECT_DELAY_MS)
+
+    logger.warning(f"Lean trade stream for {exchange_name} failed {failures} times in a row")
+
+
+async def _read_trades(ws, exchange_name, adapter, symbol_by_market_id, on_trades):
+    async for msg in ws:
+        if msg.type != aiohttp.WSMsgType.TEXT:
+            if msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                break
+            continue
+        if not msg.data.startswith("{"):
+            continue
+
+        for market_id, trades in adapter.parse(json.loads(msg.data)):
+            symbol = symbol_by_market_id.get(market_id)
+            if symbol is None or not trades:
+                continue
+            trades.sort(key=lambda t: t[0])
+            on_trades(exchange_name, symbol, trades)
+
+
+async def _ping(ws, adapter: LeanTradeAdapter):
+    while True:
+        await asyncio.sleep(adapter.ping_interval_sec)
+        await ws.send_str(adapter.ping_message())
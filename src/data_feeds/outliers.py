@@ -0,0 +1,89 @@
+import os
+import random
+from typing import List, TypeVar, Callable
+from loguru import logger
+
+# Outlier filtering applied to source prices before the weighted median: "none", "mad" or "percent"
+OUTLIER_FILTER = os.environ.get("OUTLIER_FILTER", "none").lower()
+# Sources further than k * MAD from the median are rejected in "mad" mode
+OUTLIER_MAD_K = float(os.environ.get("OUTLIER_MAD_K", 5))
+# Lower bound on MAD as a fraction of the median, so sources agreeing exactly do not reject every other price
+OUTLIER_MAD_FLOOR = float(os.environ.get("OUTLIER_MAD_FLOOR", 0.0005))
+# Sources deviating more than this fraction from the median are rejected in "percent" mode
+OUTLIER_MAX_DEVIATION = float(os.environ.get("OUTLIER_MAX_DEVIATION", 0.05))
+# Filtering is skipped for feeds with fewer sources than this
+OUTLIER_MIN_SOURCES = int(os.environ.get("OUTLIER_MIN_SOURCES", 3))
+
+# Scales MAD to be a consistent estimator of the standard deviation for normally distributed data
+MAD_SCALE = 1.4826
+
+T = TypeVar("T")
+
+
+def select_kth(values: List[float], k: int) -> float:
+    """
+    Returns the k-th smallest element (0-based) in expected linear time.
+    Reorders `values` in place so that every element after position k is >= the result.
+    """
+    lo, hi = 0, len(values) - 1
+    while lo < hi:
+        pivot = values[random.randint(lo, hi)]
+        lt, i, gt = lo, lo, hi
+        while i <= gt:
+            v = values[i]
+            if v < pivot:
+                values[lt], values[i] = v, values[lt]
+                lt += 1
+                i += 1
+            elif v > pivot:
+                values[gt], values[i] = v, values[gt]
+                gt -= 1
+            else:
+                i += 1
+        if k < lt:
+            hi = lt - 1
+        elif k > gt:
+            lo = gt + 1
+        else:
+            return pivot
+    return values[k]
+
+
+def median(values: List[float]) -> float:
+    """Median in expected linear time, reorders `values` in place."""
+    n = len(values)
+    if n == 0:
+        raise ValueError("Cannot compute median of an empty list.")
+    mid = n // 2
+    if n % 2 == 1:
+        return select_kth(values, mid)
+    lower = select_kth(values, mid - 1)
+    return (lower + min(values[mid:])) / 2
+
+
+def filter_outliers(items: List[T], value_of: Callable[[T], float], mode: str = OUTLIER_FILTER) -> List[T]:
+    if mode == "none" or len(items) < OUTLIER_MIN_SOURCES:
+        return items
+
+    values = [value_of(item) for item in items]
+    center = median(list(values))
+
+    if mode == "mad":
+        mad = median([abs(v - center) for v in values]) * MAD_SCALE
+        mad = max(mad, OUTLIER_MAD_FLOOR * abs(center))
+        max_deviation = OUTLIER_MAD_K * mad
+    elif mode == "percent":
+        max_deviation = OUTLIER_MAX_DEVIATION * abs(center)
+    else:
+        logger.warning(f"Unknown outlier filter mode {mode}, skipping filtering")
+        return items
+
+    kept = [item for item, v in zip(items, values) if abs(v - center) <= max_deviation]
+    if not kept:
+        logger.warning(f"All {len(items)} sources deviate more than {max_deviation} from median {center}, keeping all")
+        return items
+    if len(kept) < len(items):
+        logger.debug(
+            f"Rejected {len(items) - len(kept)} outlier(s) deviating more than {max_deviation} from median {center}"
+        )
+    return kept
@@ -0,0 +1,98 @@
+import math
+import os
+from array import array
+from typing import Tuple
+
+from utils.voting_round_utils import VALUES_AS_OF_OFFSET_MS, VOTING_EPOCH_DURATION_SEC
+
+# Time span the history covers on every source regardless of trade frequency. By default a full
+# voting epoch plus the as-of offset, with a margin for requests arriving late
+PRICE_HISTORY_SEC = int(
+    os.environ.get("PRICE_HISTORY_SEC", VOTING_EPOCH_DURATION_SEC + math.ceil(abs(VALUES_AS_OF_OFFSET_MS) / 1000) + 30)
+)
+# Prices within the same bucket of this size replace each other
+PRICE_HISTORY_RESOLUTION_MS = int(os.environ.get("PRICE_HISTORY_RESOLUTION_MS", 250))
+# Number of (time, price) points kept per source, one per bucket of the covered span
+PRICE_HISTORY_SIZE = math.ceil(PRICE_HISTORY_SEC * 1000 / PRICE_HISTORY_RESOLUTION_MS)
+
+
+class PriceHistory:
+    """
+    Fixed-size ring buffers of (time, price) points, one per source slot, stored in flat arrays.
+    Points are kept in time order, so point-in-time lookups are a binary search over the ring.
+    """
+
+    def __init__(self, slot_count: int, size: int = PRICE_HISTORY_SIZE, resolution_ms: int = PRICE_HISTORY_RESOLUTION_MS):
+        self.size = size
+        self.resolution_ms = resolution_ms
+        self.times = array("q", [0]) * (slot_count * size)
+        self.prices = array("d", [0.0]) * (slot_count * size)
+        # Total number of points written per slot, the next write position is written % size
+        self.written = array("q", [0]) * slot_count
+
+    def append(self, slot: int, timestamp: int, price: float):
+        base = slot * self.size
+        written = self.written[slot]
+        if written:
+            last = base + (written - 1) % self.size
+            last_time = self.times[last]
+            if timestamp < last_time:
+                return
+            if timestamp // self.resolution_ms == last_time // self.resolution_ms:
+                self.times[last] = timestamp
+                self.prices[last] = price
+                return
+
+        pos = base + written % self.size
+        self.times[pos] = timestamp
+        self.prices[pos] = price
+        self.written[slot] = written + 1
+
+    def price_at(self, slot: int, timestamp: int) -> Tuple[float, int] | None:
+        """Returns the last (price, time) point at or before `timestamp`, if still in the history."""
+        base = slot * self.size
+        written = self.written[slot]
+        count = min(written, self.size)
+        start = written - count
+
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.times[base + (start + mid) % self.size] <= timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == 0:
+            return None
+
+        pos = base + (start + lo - 1) % self.size
+        return self.prices[pos], self.times[pos]
+
+    def reaches(self, slot: int, timestamp: int) -> bool:
+        """
+        Returns whether the slot's history still covers `timestamp`, i.e. no point at or before it
+        has been evicted. A slot without a point at `timestamp` that reaches it had no price then.
+        """
+        written = self.written[slot]
+        if written <= self.size:
+            return True
+        return self.times[slot * self.size + written % self.size] <= timestamp
+
+    def series(self, slot: int) -> Tuple[Tuple[memoryview, ...], Tuple[memoryview, ...]]:
+        """Returns zero-copy views of the slot's times and prices, oldest first, split where the ring wraps."""
+        base = slot * self.size
+        written = self.written[slot]
+        count = min(written, self.size)
+        start = (written - count) % self.size
+        ranges = [(base + start, base + min(start + count, self.size))]
+        if start + count > self.size:
+            ranges.append((base, base + start + count - self.size))
+        times, prices = memoryview(self.times), memoryview(self.prices)
+        return tuple(times[a:b] for a, b in ranges if b > a), tuple(prices[a:b] for a, b in ranges if b > a)
+
+    def copy_slot(self, other: "PriceHistory", other_slot: int, slot: int):
+        if other.size != self.size:
+            return
+        self.times[slot * self.size:(slot + 1) * self.size] = other.times[other_slot * other.size:(other_slot + 1) * other.size]
+        self.prices[slot * self.size:(slot + 1) * self.size] = other.prices[other_slot * other.size:(other_slot + 1) * other.size]
+        self.written[slot] = other.written[other_slot]
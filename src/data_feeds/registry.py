@@ -0,0 +1,32 @@
+import importlib
+import os
+from typing import Dict, Type
+
+from data_feeds.base_feed import BaseDataFeed
+from data_feeds.cluster import CLUSTER_ROLE
+
+# Provider implementations by VALUE_PROVIDER_IMPL name, imported only when selected so that
+# the fixed and random providers start without loading ccxt
+PROVIDERS: Dict[str, str] = {
+    "ccxt": "data_feeds.ccxt_provider_service:CcxtFeed",
+    "fixed": "data_feeds.fixed_feed:FixedFeed",
+    "random": "data_feeds.random_feed:RandomFeed",
+    "synthetic": "data_feeds.synthetic_feed:SyntheticFeed",
+    "replica": "data_feeds.replica_feed:ReplicaFeed",
+}
+DEFAULT_PROVIDER = "ccxt"
+
+
+def provider_name() -> str:
+    # Cluster replicas serve what the collector publishes, regardless of the configured provider.
+    # Collectors run as replicas too, so a collector restarting after a failover follows the replica
+    # that took over its address instead of failing to start.
+    if CLUSTER_ROLE in ("collector", "replica"):
+        return "replica"
+    name = os.getenv("VALUE_PROVIDER_IMPL", DEFAULT_PROVIDER)
+    return name if name in PROVIDERS else DEFAULT_PROVIDER
+
+
+def provider_class(name: str | None = None) -> Type[BaseDataFeed]:
+    module_name, class_name = PROVIDERS[name or provider_name()].split(":")
+    return getattr(importlib.import_module(module_name), class_name)
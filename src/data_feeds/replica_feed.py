@@ -0,0 +1,121 @@
+import asyncio
+import random
+import time
+from injector import singleton
+
+from data_feeds.ccxt_provider_service import CONFIG_RELOAD_INTERVAL_MS, MEDIAN_RECOMPUTE_INTERVAL_MS, CcxtFeed
+from data_feeds.cluster import (
+    CLUSTER_ADDRESS,
+    CLUSTER_FAILOVER_MS,
+    CLUSTER_HEARTBEAT_MS,
+    CLUSTER_ROLE,
+    ClusterPublisher,
+    FrameApplier,
+    FrameDecoder,
+    cluster_transport,
+    read_frames,
+)
+from utils.error_utils import as_error
+from utils.retry_utils import sleep_for
+
+REPLICA_RECONNECT_MS = 1_000
+
+
+@singleton
+class ReplicaFeed(CcxtFeed):
+    """
+    Cluster replica serving prices and volumes received from a collector instead of exchanges.
+
+    Received updates are applied through the same price table and VolumeStore code as local trades,
+    so requests are served exactly like on the collector. If the collector stays unreachable for
+    CLUSTER_FAILOVER_MS, the replica tries to take over its address and starts collecting itself.
+    Only one replica can bind the address, the others keep following the new collector.
+
+    With CLUSTER_ROLE=collector it starts collecting right away, unless the address is already taken,
+    e.g. by a replica promoted while the collector was down, in which case it follows that collector.
+    Failover only works when every node can bind the address, i.e. they share one host and use a
+    loopback address or the same unix socket path. Across hosts replicas keep waiting for the collector.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.transport = cluster_transport()
+        self.promoted = False
+        self.applier = FrameApplier(self)
+
+    async def start(self):
+        if CLUSTER_ROLE == "collector":
+            try:
+                await super().start()
+                self.promoted = True
+                return
+            except OSError as e:
+                if self.publisher is not None:
+                    raise
+                self.logger.warning(f"Cluster address {CLUSTER_ADDRESS} is taken, following its collector: {as_error(e)}")
+
+        self.cold_fetcher.loop = asyncio.get_running_loop()
+        self.config = self._load_config()
+        self.config_mtime = self._config_mtime()
+        self.initialized = True
+
+        self.tasks.spawn(self._follow())
+        if CONFIG_RELOAD_INTERVAL_MS > 0:
+            self.tasks.spawn(self._watch_config())
+        if MEDIAN_RECOMPUTE_INTERVAL_MS > 0:
+            self.tasks.spawn(self._recompute_feeds())
+
+    async def _follow(self):
+        self.logger.info(f"Following cluster collector at {CLUSTER_ADDRESS}")
+        disconnected_at = time.monotonic()
+        while not self.promoted:
+            try:
+                reader, writer = await self.transport.connect()
+            except OSError:
+                if (time.monotonic() - disconnected_at) * 1000 >= CLUSTER_FAILOVER_MS:
+                    await self._try_promote()
+                # Jitter keeps replicas from attempting the takeover at the same moment
+                await sleep_for(REPLICA_RECONNECT_MS * (0.5 + random.random()))
+                continue
+
+            self.logger.info("Connected to cluster collector")
+            decoder = FrameDecoder()
+            try:
+                while True:
+                    for body in await read_frames(reader, decoder, CLUSTER_HEARTBEAT_MS * 5 / 1000):
+                        self.applier.apply(body)
+            except (asyncio.IncompleteReadError, asyncio.TimeoutError, OSError) as e:
+                self.logger.warning(f"Lost connection to cluster collector: {as_error(e)!r}")
+            finally:
+                writer.close()
+            disconnected_at = time.monotonic()
+
+    async def _try_promote(self):
+        publisher = ClusterPublisher(self.transport, self)
+        try:
+            await publisher.start()
+        except OSError as e:
+            self.logger.info(f"Not taking over as cluster collector: {as_error(e)}")
+            return
+
+        self.logger.warning("Cluster collector unreachable, taking over collecting from exchanges")
+        self.promoted = True
+        self.publisher = publisher
+        exchange_to_symbols = self._exchange_to_symbols(self.config)
+        await self._init_exchanges(exchange_to_symbols)
+        await self._init_watch_trades(exchange_to_symbols)
+        self._start_state_snapshots()
+
+    def _save_state(self):
+        # The snapshot belongs to the node collecting from exchanges, a following replica would
+        # overwrite it with a copy that may lag behind
+        if self.promoted:
+            super()._save_state()
+
+    async def _reload_config(self):
+        if self.promoted:
+            await super()._reload_config()
+            return
+        config = self._read_config()
+        self._apply_config(config)
+        self.logger.info(f"Supported feeds: {[cfg.feed.dict() for cfg in config]}")
@@ -0,0 +1,129 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+import ccxt
+from loguru import logger
+
+from utils.error_utils import as_error, error_string
+from utils.retry_utils import DEFAULT_BACKOFF_MULTIPLIER, DEFAULT_INITIAL_BACKOFF_MS, DEFAULT_MAX_RETRIES, RetryError, sleep_for
+
+# Requests an exchange may send back to back before being paced at its ccxt rateLimit
+EXCHANGE_REQUEST_BURST = int(os.environ.get("EXCHANGE_REQUEST_BURST", 3))
+# Retries an exchange earns per request, and the most it can save up; retries stop once the budget is spent
+RETRY_BUDGET_RATIO = float(os.environ.get("RETRY_BUDGET_RATIO", 0.2))
+RETRY_BUDGET_MAX = float(os.environ.get("RETRY_BUDGET_MAX", 10))
+DEFAULT_RATE_LIMIT_MS = 1_000
+
+
+class Priority(IntEnum):
+    COLD_FETCH = 0
+    POLLING = 1
+    METADATA = 2
+
+
+class ExchangeScheduler:
+    """
+    Paces REST calls to one exchange with a token bucket refilled every `rate_limit_ms`.
+
+    Calls waiting for a token are served by priority, then in arrival order. Retries draw from a
+    budget that grows with the number of requests, so a failing exchange sees a bounded number of
+    retries instead of every call site backing off on its own. Rate limit errors drain the bucket.
+    """
+
+    def __init__(self, name: str, rate_limit_ms: float, burst: int = EXCHANGE_REQUEST_BURST):
+        self.logger = logger
+        self.name = name
+        self.interval_sec = max(rate_limit_ms, 1) / 1000
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.retry_budget = RETRY_BUDGET_MAX
+        self.waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self.sequence = itertools.count()
+        self.dispatcher: asyncio.Task | None = None
+
+    async def acquire(self, priority: Priority):
+        self._refill()
+        if self.tokens >= 1 and not self.waiters:
+            self.tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.sequence), future))
+        if self.dispatcher is None or self.dispatcher.done():
+            self.dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def run(
+        self,
+        priority: Priority,
+        action: Callable[[], Awaitable[Any]],
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        initial_backoff_ms: int = DEFAULT_INITIAL_BACKOFF_MS,
+    ) -> Any:
+        self.retry_budget = min(RETRY_BUDGET_MAX, self.retry_budget + RETRY_BUDGET_RATIO)
+        attempt = 1
+        backoff_ms = initial_backoff_ms
+        while True:
+            await self.acquire(priority)
+            try:
+                return await action()
+            except Exception as e:
+                error = as_error(e)
+                if isinstance(error, (ccxt.RateLimitExceeded, ccxt.DDoSProtection)):
+                    self.penalize(backoff_ms)
+                if attempt >= max_retries or self.retry_budget < 1:
+                    raise RetryError(f"Failed to execute action on {self.name} after {attempt} attempts", error) from error
+
+                self.retry_budget -= 1
+                self.logger.opt(lazy=True).warning(
+                    "Error in retry attempt {}/{} on {}: {}", lambda: attempt, lambda: max_retries, lambda: self.name,
+                    lambda: error_string(error),
+                )
+                await sleep_for(backoff_ms / 2 + random.random() * backoff_ms)
+                backoff_ms *= DEFAULT_BACKOFF_MULTIPLIER
+                attempt += 1
+
+    def penalize(self, ms: float):
+        """Holds back all requests to the exchange for about `ms`."""
+        self._refill()
+        self.tokens = min(self.tokens, 0) - ms / 1000 / self.interval_sec
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval_sec)
+        self.updated = now
+
+    async def _dispatch(self):
+        while self.waiters:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) * self.interval_sec)
+                continue
+            _, _, future = heapq.heappop(self.waiters)
+            if future.done():
+                continue
+            self.tokens -= 1
+            future.set_result(None)
+
+
+class RequestScheduler:
+    """Per-exchange schedulers shared by all code paths calling exchange REST APIs."""
+
+    def __init__(self):
+        self.schedulers: Dict[str, ExchangeScheduler] = {}
+
+    def for_exchange(self, exchange_name: str, exchange: Any) -> ExchangeScheduler:
+        scheduler = self.schedulers.get(exchange_name)
+        if scheduler is None:
+            rate_limit_ms = getattr(exchange, "rateLimit", None) or DEFAULT_RATE_LIMIT_MS
+            scheduler = self.schedulers[exchange_name] = ExchangeScheduler(exchange_name, rate_limit_ms)
+        return scheduler
+
+    def remove(self, exchange_name: str):
+        self.schedulers.pop(exchange_name, None)
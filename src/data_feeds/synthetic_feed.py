@@ -0,0 +1,211 @@
+import asyncio
+import math
+import os
+import random
+import time
+from typing import List, Tuple
+from injector import singleton
+
+from data_feeds.ccxt_provider_service import (
+    MEDIAN_RECOMPUTE_INTERVAL_MS,
+    CcxtFeed,
+    FeedConfig,
+    FeedConfigSource,
+    usdt_to_usd_feed_id,
+)
+from data_feeds.lean_trades import LeanTrade
+from dto.provider_requests import FeedId
+from utils.error_utils import as_error
+from utils.retry_utils import sleep_for
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SYNTHETIC_FEEDS = int(os.environ.get("SYNTHETIC_FEEDS", 1000))
+SYNTHETIC_EXCHANGES = int(os.environ.get("SYNTHETIC_EXCHANGES", 20))
+SYNTHETIC_SOURCES_PER_FEED = int(os.environ.get("SYNTHETIC_SOURCES_PER_FEED", 5))
+SYNTHETIC_TICK_MS = int(os.environ.get("SYNTHETIC_TICK_MS", 100))
+# Mean number of trades per source and tick
+SYNTHETIC_TRADE_RATE = float(os.environ.get("SYNTHETIC_TRADE_RATE", 0.3))
+# Volatility of log prices per second, and the share of it driven by a common market factor
+SYNTHETIC_VOLATILITY = float(os.environ.get("SYNTHETIC_VOLATILITY", 0.0005))
+SYNTHETIC_CORRELATION = float(os.environ.get("SYNTHETIC_CORRELATION", 0.6))
+SYNTHETIC_SEED = int(os.environ.get("SYNTHETIC_SEED", 42))
+
+# Relative spread of source prices around the feed price, and of trade prices within a tick
+SOURCE_BASIS = 0.0005
+TRADE_JITTER = 0.0001
+MEAN_TRADE_VALUE_USD = 2_000
+
+
+@singleton
+class SyntheticFeed(CcxtFeed):
+    """
+    Load testing provider that simulates exchanges instead of connecting to them.
+
+    Feed prices follow correlated random walks, and every tick each source receives a Poisson number
+    of trades which are fed through the same price table, median and VolumeStore code as real trades.
+    Feeds from the config file keep their names, further SYNx/USD feeds are generated up to
+    SYNTHETIC_FEEDS. About half of the sources are quoted in USDT to exercise the USD conversion.
+    With numpy installed, prices and the trades of a tick are generated in one batch, leaving only
+    their dispatch to the sources in Python.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.rng = random.Random(SYNTHETIC_SEED)
+        self.np_rng = np.random.default_rng(SYNTHETIC_SEED) if np is not None else None
+        self.source_list: List[Tuple[str, str, int, bool]] = []
+        self.log_prices: List[float] = []
+        self.usdt_index = 0
+        self.next_trade_id = 0
+
+    async def start(self):
+        self.cold_fetcher.loop = asyncio.get_running_loop()
+        self.config = self._read_config()
+        self._apply_config(self.config)
+        self._init_simulation()
+
+        self.initialized = True
+        self.logger.warning(
+            f"Simulating {len(self.config)} feeds with {len(self.source_list)} sources "
+            f"on {SYNTHETIC_EXCHANGES} exchanges (numpy: {np is not None})"
+        )
+        self.tasks.spawn(self._simulate())
+        if MEDIAN_RECOMPUTE_INTERVAL_MS > 0:
+            self.tasks.spawn(self._recompute_feeds())
+
+    def _save_state(self):
+        # Simulated prices must not replace the snapshot of a real provider sharing STATE_SNAPSHOT_PATH
+        pass
+
+    def _read_config(self) -> List[FeedConfig]:
+        try:
+            feeds = [cfg.feed for cfg in super()._read_config()]
+        except Exception:
+            feeds = [usdt_to_usd_feed_id]
+        names = {feed.name for feed in feeds}
+        i = 0
+        while len(feeds) < SYNTHETIC_FEEDS:
+            if f"SYN{i}/USD" not in names:
+                feeds.append(FeedId(category=usdt_to_usd_feed_id.category, name=f"SYN{i}/USD"))
+            i += 1
+
+        config = []
+        for feed in feeds:
+            base = feed.name.split("/")[0]
+            exchanges = self.rng.sample(range(SYNTHETIC_EXCHANGES), min(SYNTHETIC_SOURCES_PER_FEED, SYNTHETIC_EXCHANGES))
+            sources = []
+            for exchange in exchanges:
+                quote = "USD" if base == "USDT" or exchange % 2 == 0 else "USDT"
+                sources.append(FeedConfigSource(exchange=f"synthetic{exchange}", symbol=f"{base}/{quote}"))
+            config.append(FeedConfig(feed=feed, sources=sources))
+        return config
+
+    def _init_simulation(self):
+        feed_of = {cfg.feed.name: i for i, cfg in enumerate(self.config)}
+        self.usdt_index = feed_of[usdt_to_usd_feed_id.name]
+        self.source_list = [
+            (source.exchange, source.symbol, i, source.symbol.endswith("USDT"))
+            for i, cfg in enumerate(self.config)
+            for source in cfg.sources
+        ]
+        # Log-uniform start prices between 0.001 and 100k, USDT starts at par
+        self.log_prices = [self.rng.uniform(math.log(0.001), math.log(100_000)) for _ in self.config]
+        self.log_prices[self.usdt_index] = 0.0
+        if np is not None:
+            self.log_prices = np.array(self.log_prices)
+            self.source_feed = np.array([feed for _, _, feed, _ in self.source_list])
+            self.source_usdt = np.array([usdt for _, _, _, usdt in self.source_list])
+
+    async def _simulate(self):
+        while True:
+            await sleep_for(SYNTHETIC_TICK_MS)
+            try:
+                self._tick(int(time.time() * 1000))
+            except Exception as e:
+                self.logger.error(f"Synthetic tick failed: {as_error(e)}")
+
+    def _tick(self, now: int):
+        start = now - SYNTHETIC_TICK_MS
+        if np is not None:
+            self._dispatch(*self._trades_numpy(*self._step_numpy(), start))
+            return
+
+        prices, counts = self._step_python()
+        for i, count in enumerate(counts):
+            if not count:
+                continue
+            exchange, symbol, _, _ = self.source_list[i]
+            offsets = sorted(self.rng.randrange(SYNTHETIC_TICK_MS) for _ in range(count))
+            trades: List[LeanTrade] = []
+            for offset in offsets:
+                trade_price = prices[i] * (1 + self.rng.gauss(0, TRADE_JITTER))
+                amount = self.rng.expovariate(1) * MEAN_TRADE_VALUE_USD / trade_price
+                trades.append((start + offset, trade_price, amount, self.next_trade_id))
+                self.next_trade_id += 1
+            self._on_lean_trades(exchange, symbol, trades)
+
+    def _trades_numpy(self, prices, counts, start: int):
+        """Generates the trades of all sources for one tick in a single batch, grouped by source in time order."""
+        sources = np.flatnonzero(counts)
+        trade_counts = counts[sources]
+        total = int(trade_counts.sum())
+        trade_source = np.repeat(sources, trade_counts)
+        offsets = self.np_rng.integers(0, SYNTHETIC_TICK_MS, total)
+        order = np.lexsort((offsets, trade_source))
+        trade_prices = prices[trade_source] * (1 + TRADE_JITTER * self.np_rng.standard_normal(total))
+        amounts = self.np_rng.exponential(1, total) * MEAN_TRADE_VALUE_USD / trade_prices
+        ids = range(self.next_trade_id, self.next_trade_id + total)
+        self.next_trade_id += total
+
+        trades = list(zip((start + offsets[order]).tolist(), trade_prices[order].tolist(), amounts[order].tolist(), ids))
+        return sources.tolist(), np.cumsum(trade_counts).tolist(), trades
+
+    def _dispatch(self, sources: List[int], ends: List[int], trades: List[LeanTrade]):
+        begin = 0
+        for i, end in zip(sources, ends):
+            exchange, symbol, _, _ = self.source_list[i]
+            self._on_lean_trades(exchange, symbol, trades[begin:end])
+            begin = end
+
+    def _step_numpy(self):
+        sigma = SYNTHETIC_VOLATILITY * math.sqrt(SYNTHETIC_TICK_MS / 1000)
+        shocks = self.np_rng.standard_normal(len(self.log_prices) + 1)
+        self.log_prices += sigma * (
+            SYNTHETIC_CORRELATION * shocks[0] + math.sqrt(1 - SYNTHETIC_CORRELATION**2) * shocks[1:]
+        )
+        # USDT stays pegged, only drifting by its own noise
+        self.log_prices[self.usdt_index] = 0.1 * sigma * shocks[self.usdt_index + 1]
+
+        feed_prices = np.exp(self.log_prices)
+        prices = feed_prices[self.source_feed] * (1 + SOURCE_BASIS * self.np_rng.standard_normal(len(self.source_list)))
+        prices = np.where(self.source_usdt, prices / feed_prices[self.usdt_index], prices)
+        counts = self.np_rng.poisson(SYNTHETIC_TRADE_RATE, len(self.source_list))
+        return prices, counts
+
+    def _step_python(self):
+        sigma = SYNTHETIC_VOLATILITY * math.sqrt(SYNTHETIC_TICK_MS / 1000)
+        market = self.rng.gauss(0, 1)
+        idiosyncratic = math.sqrt(1 - SYNTHETIC_CORRELATION**2)
+        for i in range(len(self.log_prices)):
+            self.log_prices[i] += sigma * (SYNTHETIC_CORRELATION * market + idiosyncratic * self.rng.gauss(0, 1))
+        self.log_prices[self.usdt_index] = 0.1 * sigma * self.rng.gauss(0, 1)
+
+        usdt = math.exp(self.log_prices[self.usdt_index])
+        prices, counts = [], []
+        for _, _, feed, is_usdt in self.source_list:
+            price = math.exp(self.log_prices[feed]) * (1 + self.rng.gauss(0, SOURCE_BASIS))
+            prices.append(price / usdt if is_usdt else price)
+            counts.append(self._poisson(SYNTHETIC_TRADE_RATE))
+        return prices, counts
+
+    def _poisson(self, rate: float) -> int:
+        # Knuth's method, rates here are small
+        limit, k, p = math.exp(-rate), 0, self.rng.random()
+        while p > limit:
+            k += 1
+            p *= self.rng.random()
+        return k
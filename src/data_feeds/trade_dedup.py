@@ -0,0 +1,28 @@
+import os
+from typing import Hashable, Set
+
+# Trade ids remembered per generation, each source keeps at most two generations
+TRADE_DEDUP_SIZE = int(os.environ.get("TRADE_DEDUP_SIZE", 1000))
+
+
+class TradeDedup:
+    """
+    Remembers recently seen trade ids of one source in two rolling generations of hashed ids.
+    Once the current generation is full it replaces the previous one, so memory stays bounded
+    while the last `size` to `2 * size` ids are always recognized.
+    """
+
+    def __init__(self, size: int = TRADE_DEDUP_SIZE):
+        self.size = size
+        self.current: Set[int] = set()
+        self.previous: Set[int] = set()
+
+    def seen(self, trade_id: Hashable) -> bool:
+        """Returns whether the id was seen before, recording it otherwise."""
+        key = hash(trade_id)
+        if key in self.current or key in self.previous:
+            return True
+        self.current.add(key)
+        if len(self.current) >= self.size:
+            self.previous, self.current = self.current, set()
+        return False
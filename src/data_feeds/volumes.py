@@ -1,37 +1,83 @@
+import os
 import time
-from typing import List, Dict
+from array import array
+from typing import Any, List, Dict, Sequence, Tuple
 from loguru import logger
 
+from data_feeds.trade_dedup import TradeDedup
+
 HISTORY_SEC = 3600
+# Window of the running volume total used for volume weighted medians
+ROLLING_VOLUME_WINDOW_SEC = min(int(os.environ.get("MEDIAN_VOLUME_WINDOW_SEC", 600)), HISTORY_SEC)
 
 
 class VolumeStore:
-    def __init__(self):
+    def __init__(self, rolling_window_sec: int = ROLLING_VOLUME_WINDOW_SEC):
         self.logger = logger
-        self.volume_sec = [0] * HISTORY_SEC
+        # Per-second volume ring buffer, the bucket of second t is at t % HISTORY_SEC
+        self.volume_sec = array("d", [0.0]) * HISTORY_SEC
         self.last_ts: int | None = None
+        # Running total of the last rolling_window_sec seconds up to last_ts, updated as trades arrive
+        self.rolling_window_sec = rolling_window_sec
+        self.rolling_sum = 0.0
+        self.dedup = TradeDedup()
+        # Trades up to this timestamp are already part of a restored history
+        self.skip_until_ts = 0
 
-    def process_trades(self, trades: List[Dict]):
+    def process_trades(self, trades: List[Dict]) -> List[Dict]:
+        """Adds the volume of trades not seen before, identified by trade id, and returns those trades."""
+        new_trades = []
         for trade in trades:
             if not trade.get("timestamp"):
                 self.logger.warning(f"Trade with missing timestamp: {trade}")
                 continue
+            if trade["timestamp"] <= self.skip_until_ts:
+                continue
+            trade_id = trade.get("id")
+            if self.dedup.seen(trade_id if trade_id is not None else (trade["timestamp"], trade["price"], trade["amount"])):
+                continue
+            self._add_volume(trade["timestamp"], self._calculate_volume(trade))
+            new_trades.append(trade)
+        return new_trades
 
-            if self.last_ts and trade["timestamp"] < self.last_ts:
-                self.logger.debug(
-                    f"Trade with timestamp {trade['timestamp']} is older than last processed trade {self.last_ts}, skipping. Trade: {trade}"
-                )
+    def process_lean_trades(self, trades: List[Tuple[int, float, float, Any]]) -> List[Tuple[int, float, float, Any]]:
+        """Same as process_trades, for (timestamp, price, amount, id) tuples."""
+        new_trades = []
+        for trade in trades:
+            timestamp, price, amount, trade_id = trade
+            if timestamp <= self.skip_until_ts:
                 continue
+            if self.dedup.seen(trade_id if trade_id is not None else (timestamp, price, amount)):
+                continue
+            self._add_volume(timestamp, price * amount)
+            new_trades.append(trade)
+        return new_trades
+
+    def _add_volume(self, timestamp: int, volume: float):
+        t_sec = self._to_sec(timestamp)
+        last_t_sec = self._to_sec(self.last_ts) if self.last_ts else t_sec
 
-            t_sec = self._to_sec(trade["timestamp"])
-            last_t_sec = self._to_sec(self.last_ts) if self.last_ts else t_sec
+        # Late trades are still counted while their second is within the history
+        if self.last_ts and timestamp < self.last_ts:
+            if t_sec > last_t_sec - HISTORY_SEC:
+                self.volume_sec[t_sec % HISTORY_SEC] += volume
+                if t_sec > last_t_sec - self.rolling_window_sec:
+                    self.rolling_sum += volume
+            else:
+                self.logger.debug(f"Trade with timestamp {timestamp} is older than the volume history, skipping.")
+            return
 
+        if t_sec - last_t_sec >= HISTORY_SEC:
+            self.volume_sec = array("d", [0.0]) * HISTORY_SEC
+            self.rolling_sum = 0.0
+        else:
             for t in range(last_t_sec + 1, t_sec + 1):
+                self.rolling_sum -= self.volume_sec[(t - self.rolling_window_sec) % HISTORY_SEC]
                 self.volume_sec[t % HISTORY_SEC] = 0
 
-            volume = self._calculate_volume(trade)
-            self.volume_sec[t_sec % HISTORY_SEC] += volume
-            self.last_ts = trade["timestamp"]
+        self.volume_sec[t_sec % HISTORY_SEC] += volume
+        self.rolling_sum += volume
+        self.last_ts = timestamp
 
     def get_volume(self, window_sec: int) -> float:
         if window_sec > HISTORY_SEC:
@@ -50,6 +96,47 @@ class VolumeStore:
 
         return volume
 
+    def restore(self, last_ts: int, volume_sec: Sequence[float]):
+        """Replaces the history with one taken from another store, e.g. received from a cluster collector."""
+        if len(volume_sec) != HISTORY_SEC:
+            raise ValueError(f"Expected {HISTORY_SEC} seconds of volume history, got {len(volume_sec)}")
+        self.volume_sec = array("d", volume_sec)
+        self.last_ts = last_ts
+        last_t_sec = self._to_sec(last_ts)
+        self.rolling_sum = sum(
+            self.volume_sec[t % HISTORY_SEC] for t in range(last_t_sec - self.rolling_window_sec + 1, last_t_sec + 1)
+        )
+
+    def skip_until(self, timestamp: int | None):
+        """Ignores trades up to `timestamp`, after restoring a history that already counts them."""
+        self.skip_until_ts = timestamp or 0
+
+    def history(self) -> Tuple[int, Tuple[memoryview, ...]]:
+        """
+        Returns the second of the oldest bucket and zero-copy views of the per-second volumes, oldest
+        first, split in two where the ring buffer wraps. Seconds after the last trade have no volume.
+        """
+        if not self.last_ts:
+            return 0, ()
+        last_t_sec = self._to_sec(self.last_ts)
+        wrap = (last_t_sec + 1) % HISTORY_SEC
+        view = memoryview(self.volume_sec)
+        return last_t_sec - HISTORY_SEC + 1, tuple(v for v in (view[wrap:], view[:wrap]) if len(v))
+
+    def rolling_volume(self, now_ms: int | None = None) -> float:
+        """Volume over the last rolling_window_sec seconds, only touching seconds passed since the last trade."""
+        if not self.last_ts:
+            return 0
+        last_t_sec = self._to_sec(self.last_ts)
+        gap = self._to_sec(now_ms if now_ms is not None else int(time.time() * 1000)) - last_t_sec
+        if gap >= self.rolling_window_sec:
+            return 0
+        volume = self.rolling_sum
+        for t in range(last_t_sec + 1, last_t_sec + gap + 1):
+            volume -= self.volume_sec[(t - self.rolling_window_sec) % HISTORY_SEC]
+        # Guards against float drift of the running sum
+        return max(volume, 0.0)
+
     def _calculate_volume(self, trade: Dict) -> float:
         return trade["amount"] * trade["price"]
 
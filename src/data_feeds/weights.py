@@ -0,0 +1,31 @@
+import math
+from functools import lru_cache
+
+# Staleness resolution of precomputed decay weights
+DECAY_TABLE_STEP_MS = 100
+MAX_DECAY_TABLE_SIZE = 100_000
+# Weights below this are treated as fully decayed, staleness beyond that point reuses the last entry
+MIN_DECAY_WEIGHT = 1e-12
+
+
+class DecayTable:
+    """Precomputed exp(-decay * staleness) curve, replacing per-source math.exp calls with a lookup."""
+
+    def __init__(self, decay: float):
+        self.decay = decay
+        horizon_ms = -math.log(MIN_DECAY_WEIGHT) / decay if decay > 0 else 0
+        self.step_ms = max(DECAY_TABLE_STEP_MS, math.ceil(horizon_ms / MAX_DECAY_TABLE_SIZE))
+        size = int(horizon_ms // self.step_ms) + 1
+        self.table = [math.exp(-decay * i * self.step_ms) for i in range(size)]
+        self.last = len(self.table) - 1
+
+    def weight(self, staleness_ms: int) -> float:
+        i = staleness_ms // self.step_ms
+        if i > self.last:
+            return self.table[self.last]
+        return self.table[i] if i > 0 else 1.0
+
+
+@lru_cache(maxsize=None)
+def decay_table(decay: float) -> DecayTable:
+    return DecayTable(decay)
@@ -0,0 +1,34 @@
+from sqlalchemy import BigInteger, Float, Integer, String
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+# SQLite only auto-increments INTEGER primary keys
+HistoryId = BigInteger().with_variant(Integer, "sqlite")
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class FeedValueHistory(Base):
+    __tablename__ = "feed_value_history"
+
+    id: Mapped[int] = mapped_column(HistoryId, primary_key=True, autoincrement=True)
+    voting_round_id: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    category: Mapped[int] = mapped_column(Integer)
+    name: Mapped[str] = mapped_column(String, index=True)
+    value: Mapped[float | None] = mapped_column(Float, nullable=True)
+    served_at: Mapped[int] = mapped_column(BigInteger, index=True)
+
+
+class SourcePriceHistory(Base):
+    __tablename__ = "source_price_history"
+
+    id: Mapped[int] = mapped_column(HistoryId, primary_key=True, autoincrement=True)
+    voting_round_id: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    category: Mapped[int] = mapped_column(Integer)
+    name: Mapped[str] = mapped_column(String, index=True)
+    exchange: Mapped[str] = mapped_column(String)
+    symbol: Mapped[str] = mapped_column(String)
+    price: Mapped[float] = mapped_column(Float)
+    price_time: Mapped[int] = mapped_column(BigInteger)
+    served_at: Mapped[int] = mapped_column(BigInteger, index=True)
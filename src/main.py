@@ -1,12 +1,26 @@
+import asyncio
 import uvicorn
+from uvicorn.supervisors import Multiprocess
 import os
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from nest.core import PyNestFactory
 from contextlib import asynccontextmanager
 
+from admission_control import ADMISSION_CONTROL, AdmissionControlMiddleware
 from app_module import AppModule
-from data_feeds.ccxt_provider_service import CcxtFeed
+from app_service import AppService
+from history.history_writer import HistoryWriter
+from profiling import PROFILER_ENABLED, ProfilerMiddleware, profiler
+from utils.server_utils import (
+    HANDOFF_WARMUP_MS,
+    INGESTION_THREAD,
+    SERVER_PROFILE,
+    SERVER_REUSE_PORT,
+    IngestionThread,
+    reuse_port_socket,
+    server_options,
+)
 
 load_dotenv()
 
@@ -17,23 +31,60 @@ async def lifespan(app: FastAPI):
     Handles startup and shutdown events for the application.
     """
     print("Starting up...")
-    value_provider_impl = os.getenv("VALUE_PROVIDER_IMPL", "ccxt")
-    if value_provider_impl == "ccxt":
-        try:
-            injector = app.extra['injector']
-            ccxt_feed = injector.get(CcxtFeed)
-            await ccxt_feed.start()
-        except KeyError:
-            print("Injector not found in app.extra. Could not start CcxtFeed.")
-        except Exception as e:
-            print(f"An error occurred during CcxtFeed startup: {e}")
+    profiler.watch_loop(asyncio.get_running_loop(), "main")
+    ingestion = None
+    data_feed = None
+    try:
+        injector = app.extra['injector']
+        data_feed = injector.get(AppService).data_feed
+        # Only live providers such as CcxtFeed need to be started
+        if hasattr(data_feed, "start"):
+            if INGESTION_THREAD:
+                ingestion = IngestionThread()
+                ingestion.start()
+                profiler.watch_loop(ingestion.loop, "ingestion")
+                await asyncio.wrap_future(ingestion.submit(data_feed.start()))
+            else:
+                await data_feed.start()
+        # The port is only listened on after startup, so a restarted instance takes over once it has prices
+        if SERVER_REUSE_PORT and hasattr(data_feed, "wait_ready"):
+            await _on_feed_loop(ingestion, data_feed.wait_ready(HANDOFF_WARMUP_MS))
+    except KeyError:
+        print("Injector not found in app.extra. Could not start the data feed.")
+    except Exception as e:
+        print(f"An error occurred during data feed startup: {e}")
+
+    history = None
+    try:
+        history = app.extra['injector'].get(HistoryWriter)
+        await history.start()
+    except KeyError:
+        print("Injector not found in app.extra. Could not start HistoryWriter.")
+    except Exception as e:
+        print(f"An error occurred during HistoryWriter startup: {e}")
 
     yield
 
     print("Shutting down...")
+    if history is not None:
+        await history.stop()
+    if hasattr(data_feed, "stop"):
+        try:
+            await _on_feed_loop(ingestion, data_feed.stop())
+        except Exception as e:
+            print(f"An error occurred during data feed shutdown: {e}")
+    if ingestion is not None:
+        ingestion.stop()
+    profiler.stop()
 
 
-def main():
+async def _on_feed_loop(ingestion: IngestionThread | None, coro):
+    if ingestion is not None:
+        return await asyncio.wrap_future(ingestion.submit(coro))
+    return await coro
+
+
+def create_app() -> FastAPI:
     app: FastAPI = PyNestFactory.create(
         AppModule,
         root_path="/",
@@ -45,9 +96,35 @@ def main():
 
     # Set up lifespan events
     app.router.lifespan_context = lifespan
+    if ADMISSION_CONTROL:
+        app.add_middleware(AdmissionControlMiddleware)
+    if PROFILER_ENABLED:
+        # Added last so it runs first, profiling an overloaded server must not wait for admission
+        app.add_middleware(ProfilerMiddleware)
+    return app
 
+
+def main():
     port = int(os.getenv("VALUE_PROVIDER_CLIENT_PORT", 3101))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    options = server_options()
+    print(f"Launching with server profile '{SERVER_PROFILE}': {options}")
+    if SERVER_REUSE_PORT:
+        workers = options.get("workers", 1)
+        config = uvicorn.Config(
+            "main:create_app" if workers > 1 else create_app(), factory=workers > 1, host="0.0.0.0", port=port, **options
+        )
+        # uvicorn.run binds its own socket, so the server is run on a socket shared through SO_REUSEPORT instead
+        sock = reuse_port_socket(config.host, config.port)
+        server = uvicorn.Server(config)
+        if workers > 1:
+            Multiprocess(config, target=server.run, sockets=[sock]).run()
+        else:
+            server.run(sockets=[sock])
+    elif options.get("workers", 1) > 1:
+        # Every worker process builds its own app, including its own exchange connections
+        uvicorn.run("main:create_app", factory=True, host="0.0.0.0", port=port, **options)
+    else:
+        uvicorn.run(create_app(), host="0.0.0.0", port=port, **options)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, List, NamedTuple, Tuple
+from urllib.parse import parse_qs
+from loguru import logger
+
+# Serves the sampling profiler and recorded loop stalls under /admin, these endpoints bypass admission control
+PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "false").lower() == "true"
+PROFILER_INTERVAL_MS = float(os.environ.get("PROFILER_INTERVAL_MS", 5))
+PROFILER_MAX_SECONDS = int(os.environ.get("PROFILER_MAX_SECONDS", 60))
+# Event loop callbacks blocking longer than this are logged with their stack, set to 0 to disable
+LOOP_STALL_THRESHOLD_MS = int(os.environ.get("LOOP_STALL_THRESHOLD_MS", 250))
+LOOP_STALL_MAX_RECORDS = int(os.environ.get("LOOP_STALL_MAX_RECORDS", 100))
+PROFILE_PATH = "/admin/profile"
+STALLS_PATH = "/admin/stalls"
+
+
+class Stall(NamedTuple):
+    loop: str
+    started_at: int
+    duration_ms: float
+    stack: Tuple[str, ...]
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    short_path = os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path))
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({short_path}:{frame.f_lineno})"
+
+
+def frame_stack(frame) -> Tuple[str, ...]:
+    """Labels of a frame and its callers, outermost first."""
+    stack = []
+    while frame is not None:
+        stack.append(frame_label(frame))
+        frame = frame.f_back
+    return tuple(reversed(stack))
+
+
+def thread_stack(thread_id: int) -> Tuple[str, ...]:
+    return frame_stack(sys._current_frames().get(thread_id))
+
+
+def collapsed(stacks: Counter) -> str:
+    """Formats stack counts as collapsed stacks ("frame;frame;frame count"), as read by flamegraph tools."""
+    return "".join(f"{';'.join(stack)} {count}\n" for stack, count in stacks.most_common())
+
+
+class LoopWatchdog:
+    """
+    Detects event loop stalls. The loop schedules a heartbeat callback every quarter of the threshold,
+    and a watchdog thread checks that it keeps running. When a heartbeat is overdue by more than the
+    threshold, the stack of the loop thread is captured, since it is the code blocking the loop.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, name: str, threshold_ms: int, records: Deque[Stall]):
+        self.logger = logger
+        self.loop = loop
+        self.name = name
+        self.threshold_sec = threshold_ms / 1000
+        self.interval_sec = self.threshold_sec / 4
+        self.records = records
+        self.thread_id: int | None = None
+        self.next_beat = time.monotonic() + self.interval_sec
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._watch, name=f"{name}-watchdog", daemon=True)
+
+    def start(self):
+        self.loop.call_soon_threadsafe(self._beat)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def _beat(self):
+        self.thread_id = threading.get_ident()
+        self.next_beat = time.monotonic() + self.interval_sec
+        if not self.stopped.is_set():
+            self.loop.call_later(self.interval_sec, self._beat)
+
+    def _watch(self):
+        stall: Tuple[float, int, Tuple[str, ...]] | None = None
+        while not self.stopped.wait(self.interval_sec):
+            next_beat = self.next_beat
+            overdue = time.monotonic() - next_beat
+            if stall is None and overdue > self.threshold_sec and self.thread_id is not None:
+                stall = (next_beat, int(time.time() * 1000 - overdue * 1000), thread_stack(self.thread_id))
+            elif stall is not None and next_beat != stall[0]:
+                # The loop is running again, the stall lasted until the overdue heartbeat ran
+                blocked_since, started_at, stack = stall
+                duration_ms = (next_beat - self.interval_sec - blocked_since) * 1000
+                self.records.append(Stall(self.name, started_at, round(duration_ms, 1), stack))
+                self.logger.warning(f"Event loop {self.name} blocked for {duration_ms:.0f} ms in {' <- '.join(reversed(stack[-3:]))}")
+                stall = None
+
+
+class Profiler:
+    """
+    Samples the stacks of registered event loop threads on demand, and keeps the stalls recorded by
+    their watchdogs. Sampling runs in a separate thread reading sys._current_frames(), so the sampled
+    code is not instrumented and only pays for the sampler briefly holding the GIL.
+    """
+
+    def __init__(self):
+        self.logger = logger
+        self.loops: Dict[int, str] = {}
+        self.watchdogs: List[LoopWatchdog] = []
+        self.stalls: Deque[Stall] = deque(maxlen=LOOP_STALL_MAX_RECORDS)
+        self.sampling = threading.Lock()
+
+    def watch_loop(self, loop: asyncio.AbstractEventLoop, name: str):
+        """Registers the thread running `loop` for profiling and starts its stall watchdog."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._register_thread(name)
+        else:
+            loop.call_soon_threadsafe(self._register_thread, name)
+        if LOOP_STALL_THRESHOLD_MS > 0:
+            watchdog = LoopWatchdog(loop, name, LOOP_STALL_THRESHOLD_MS, self.stalls)
+            watchdog.start()
+            self.watchdogs.append(watchdog)
+
+    def _register_thread(self, name: str):
+        self.loops[threading.get_ident()] = name
+
+    def stop(self):
+        for watchdog in self.watchdogs:
+            watchdog.stop()
+        self.watchdogs = []
+
+    def sample(self, seconds: float, interval_ms: float = PROFILER_INTERVAL_MS) -> Counter:
+        """Samples the loop threads for `seconds`, blocking the calling thread. Stacks are prefixed with the loop name."""
+        if not self.sampling.acquire(blocking=False):
+            raise RuntimeError("A profile is already being recorded")
+        try:
+            stacks: Counter = Counter()
+            interval_sec = interval_ms / 1000
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                frames = sys._current_frames()
+                for thread_id, name in list(self.loops.items()):
+                    stack = frame_stack(frames.get(thread_id))
+                    if stack:
+                        stacks[(name, *stack)] += 1
+                del frames
+                time.sleep(interval_sec)
+            return stacks
+        finally:
+            self.sampling.release()
+
+    async def profile(self, seconds: float) -> str:
+        self.logger.info(f"Recording {seconds}s profile of {list(self.loops.values())} event loops")
+        return collapsed(await asyncio.to_thread(self.sample, min(seconds, PROFILER_MAX_SECONDS)))
+
+
+profiler = Profiler()
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware serving GET /admin/profile?seconds=N, returning collapsed stacks sampled for N
+    seconds, and GET /admin/stalls, returning the recorded event loop stalls.
+    """
+
+    def __init__(self, app, instance: Profiler | None = None):
+        self.app = app
+        self.profiler = instance or profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in (PROFILE_PATH, STALLS_PATH):
+            await self.app(scope, receive, send)
+            return
+
+        if scope["path"] == STALLS_PATH:
+            await self._respond(send, 200, json.dumps([stall._asdict() for stall in self.profiler.stalls]), b"application/json")
+            return
+
+        query = parse_qs(scope.get("query_string", b"").decode())
+        try:
+            seconds = float(query.get("seconds", ["10"])[0])
+        except ValueError:
+            await self._respond(send, 400, "seconds must be a number\n")
+            return
+        try:
+            body = await self.profiler.profile(seconds)
+        except RuntimeError as e:
+            await self._respond(send, 409, f"{e}\n")
+            return
+        await self._respond(send, 200, body)
+
+    async def _respond(self, send, status: int, body: str, content_type: bytes = b"text/plain; charset=utf-8"):
+        content = body.encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-type", content_type), (b"content-length", str(len(content)).encode())],
+            }
+        )
+        await send({"type": "http.response.body", "body": content})
@@ -0,0 +1,32 @@
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+MAX_CACHED_RESULTS = 10_000
+
+
+class SingleFlight:
+    """
+    Shares the result of an action with callers asking for the same key within `window_ms`, so
+    repeated requests for the same feeds are computed once per window.
+    """
+
+    def __init__(self, window_ms: int):
+        self.window_sec = window_ms / 1000
+        self.results: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def run(self, key: Hashable, action: Callable[[], Any]) -> Any:
+        """Returns the result stored for `key` within the window, otherwise runs `action` and stores its result."""
+        cached = self.results.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        result = action()
+        if self.window_sec > 0:
+            self._store(key, result)
+        return result
+
+    def _store(self, key: Hashable, result: Any):
+        now = time.monotonic()
+        if len(self.results) >= MAX_CACHED_RESULTS:
+            self.results = {k: v for k, v in self.results.items() if v[0] > now}
+        self.results[key] = (now + self.window_sec, result)
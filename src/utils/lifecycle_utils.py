@@ -0,0 +1,79 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Coroutine, Iterable, Set
+from loguru import logger
+
+from utils.error_utils import as_error
+
+# Time a data feed gets to cancel its tasks and close its exchange connections on shutdown
+SHUTDOWN_TIMEOUT_MS = int(os.environ.get("SHUTDOWN_TIMEOUT_MS", 5_000))
+# File the latest prices and volume histories are saved to on shutdown and restored from on startup, empty to disable
+STATE_SNAPSHOT_PATH = os.environ.get("STATE_SNAPSHOT_PATH", "")
+# Older snapshots are ignored, their prices would be served as if they were current
+STATE_SNAPSHOT_MAX_AGE_MS = int(os.environ.get("STATE_SNAPSHOT_MAX_AGE_MS", 60_000))
+# The snapshot is also saved this often while running, so an instance taking over the port while this one
+# is still serving restores recent state. Set to 0 to only save on shutdown
+STATE_SNAPSHOT_INTERVAL_MS = int(os.environ.get("STATE_SNAPSHOT_INTERVAL_MS", 10_000))
+
+
+class TaskTracker:
+    """
+    Keeps references to background tasks, so they are not garbage collected while running and can
+    all be cancelled on shutdown. Finished tasks are dropped, failures are logged.
+    """
+
+    def __init__(self):
+        self.logger = logger
+        self.tasks: Set[asyncio.Task] = set()
+
+    def spawn(self, coro: Coroutine) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self._on_done)
+        return task
+
+    async def cancel_all(self, timeout_sec: float):
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=max(timeout_sec, 0))
+        if pending:
+            self.logger.warning(f"{len(pending)} tasks did not finish within {timeout_sec:.1f}s of being cancelled")
+
+    def _on_done(self, task: asyncio.Task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error(f"Background task {task.get_name()} failed: {as_error(task.exception())}")
+
+
+class Deadline:
+    def __init__(self, timeout_ms: int):
+        self.expires = time.monotonic() + timeout_ms / 1000
+
+    def remaining(self) -> float:
+        return max(self.expires - time.monotonic(), 0)
+
+
+async def gather_within(awaitables: Iterable[Awaitable], timeout_sec: float) -> int:
+    """Runs awaitables concurrently for at most `timeout_sec`, ignoring failures. Returns how many did not finish."""
+    tasks = [asyncio.ensure_future(a) for a in awaitables]
+    if not tasks:
+        return 0
+    _, pending = await asyncio.wait(tasks, timeout=max(timeout_sec, 0))
+    for task in pending:
+        task.cancel()
+    return len(pending)
+
+
+def write_atomically(path: str, data: bytes):
+    """Writes through a temporary file, so a crash while writing never leaves a truncated file behind."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
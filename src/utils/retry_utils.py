@@ -26,7 +26,10 @@ async def retry(action, max_retries=DEFAULT_MAX_RETRIES, initial_backoff_ms=DEFA
             return await action()
         except Exception as e:
             error = as_error(e)
-            logger.warning(f"Error in retry attempt {attempt}/{max_retries}: {error_string(error)}")
+            # Formatting the stack is deferred until the message is actually emitted
+            logger.opt(lazy=True).warning(
+                "Error in retry attempt {}/{}: {}", lambda: attempt, lambda: max_retries, lambda: error_string(error)
+            )
             attempt += 1
             if attempt > max_retries:
                 raise RetryError(f"Failed to execute action after {max_retries} attempts", error) from error
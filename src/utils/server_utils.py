@@ -0,0 +1,86 @@
+import asyncio
+import importlib.util
+import os
+import socket
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Dict
+from loguru import logger
+
+# "default" runs uvicorn with its defaults apart from the shutdown timeout, "production" applies the tuned options below
+SERVER_PROFILE = os.environ.get("SERVER_PROFILE", "default").lower()
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", 1))
+SERVER_BACKLOG = int(os.environ.get("SERVER_BACKLOG", 2048))
+SERVER_KEEP_ALIVE_SEC = int(os.environ.get("SERVER_KEEP_ALIVE_SEC", 5))
+# Runs exchange ingestion on its own event loop thread instead of the HTTP loop
+INGESTION_THREAD = os.environ.get("INGESTION_THREAD", "false").lower() == "true"
+# Binds the port with SO_REUSEPORT, so a new instance can start accepting before the old one stops
+SERVER_REUSE_PORT = os.environ.get("SERVER_REUSE_PORT", "false").lower() == "true"
+# With SERVER_REUSE_PORT, a new instance waits up to this long for prices of all feeds before accepting requests
+HANDOFF_WARMUP_MS = int(os.environ.get("HANDOFF_WARMUP_MS", 15_000))
+# Time in-flight requests get to complete after a shutdown signal
+SERVER_GRACEFUL_SHUTDOWN_SEC = int(os.environ.get("SERVER_GRACEFUL_SHUTDOWN_SEC", 10))
+
+
+def has_module(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
+
+
+def server_options(profile: str = SERVER_PROFILE) -> Dict[str, Any]:
+    """uvicorn.run keyword arguments for the given launch profile."""
+    if profile != "production":
+        return {"timeout_graceful_shutdown": SERVER_GRACEFUL_SHUTDOWN_SEC}
+    return {
+        "timeout_graceful_shutdown": SERVER_GRACEFUL_SHUTDOWN_SEC,
+        "loop": "uvloop" if has_module("uvloop") else "asyncio",
+        "http": "httptools" if has_module("httptools") else "h11",
+        "workers": SERVER_WORKERS,
+        "backlog": SERVER_BACKLOG,
+        "timeout_keep_alive": SERVER_KEEP_ALIVE_SEC,
+        "access_log": False,
+    }
+
+
+def new_event_loop(profile: str = SERVER_PROFILE) -> asyncio.AbstractEventLoop:
+    if profile == "production" and has_module("uvloop"):
+        import uvloop
+
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+
+def reuse_port_socket(host: str, port: int) -> socket.socket:
+    """
+    Listening socket other processes can bind as well. The kernel spreads new connections across all
+    processes listening on the port, so a restarted instance takes over while the old one drains.
+    """
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+class IngestionThread:
+    """Event loop running in a daemon thread, so exchange traffic does not compete with request handling."""
+
+    def __init__(self, name: str = "ingestion"):
+        self.logger = logger
+        self.loop = new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        self.logger.info(f"Started {self.thread.name} event loop thread ({type(self.loop).__module__})")
+
+    def submit(self, coro: Coroutine) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self, timeout_sec: float = 5):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout_sec)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
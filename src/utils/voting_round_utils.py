@@ -0,0 +1,14 @@
+import os
+
+# Defaults match the Flare mainnet voting epoch settings
+FIRST_VOTING_ROUND_START_SEC = int(os.environ.get("FIRST_VOTING_ROUND_START_SEC", 1658430000))
+VOTING_EPOCH_DURATION_SEC = int(os.environ.get("VOTING_EPOCH_DURATION_SEC", 90))
+# Offset added to the voting round boundary for as-of queries, negative values query before it
+VALUES_AS_OF_OFFSET_MS = int(os.environ.get("VALUES_AS_OF_OFFSET_MS", 0))
+
+
+def voting_round_start_ms(voting_round_id: int) -> int:
+    return (FIRST_VOTING_ROUND_START_SEC + voting_round_id * VOTING_EPOCH_DURATION_SEC) * 1000
+
+def voting_round_end_ms(voting_round_id: int) -> int:
+    return voting_round_start_ms(voting_round_id + 1)
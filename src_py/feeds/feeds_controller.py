@@ -1,9 +1,11 @@
+from typing import List
+from fastapi import Query
 from nest.core import Controller, Get, Post, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.config import config
 
 
-from .feeds_service import FeedsService
+from .feeds_service import FeedsService, DEFAULT_PAGE_SIZE
 from .feeds_model import Feeds
 
 
@@ -14,10 +16,19 @@ class FeedsController:
         self.feeds_service = feeds_service
 
     @Get("/")
-    async def get_feeds(self, session: AsyncSession = Depends(config.get_db)):
-        return await self.feeds_service.get_feeds(session)
+    async def get_feeds(
+        self,
+        after: int = Query(0, description="Return feeds with an id greater than this one"),
+        limit: int = Query(DEFAULT_PAGE_SIZE),
+        session: AsyncSession = Depends(config.get_db),
+    ):
+        return await self.feeds_service.get_feeds(session, after, limit)
 
     @Post("/")
     async def add_feeds(self, feeds: Feeds, session: AsyncSession = Depends(config.get_db)):
         return await self.feeds_service.add_feeds(feeds, session)
+
+    @Post("/bulk")
+    async def add_feeds_bulk(self, feeds: List[Feeds], session: AsyncSession = Depends(config.get_db)):
+        return await self.feeds_service.add_feeds_bulk(feeds, session)
  
\ No newline at end of file
@@ -1,14 +1,26 @@
+from typing import Dict, List, Tuple
 from .feeds_model import Feeds
 from .feeds_entity import Feeds as FeedsEntity
 from nest.core.decorators.database import async_db_request_handler
 from nest.core import Injectable
 
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+# Rows per INSERT statement, keeps each statement well below the asyncpg bind parameter limit
+BULK_INSERT_CHUNK_SIZE = 10_000
+DEFAULT_PAGE_SIZE = 1_000
+MAX_PAGE_SIZE = 10_000
+MAX_CACHED_PAGES = 1_024
+
 @Injectable
 class FeedsService:
 
+    def __init__(self):
+        # Read-through cache of feed pages keyed by (after_id, limit), invalidated on every write
+        self.page_cache: Dict[Tuple[int, int], List[dict]] = {}
+
     @async_db_request_handler
     async def add_feeds(self, feeds: Feeds, session: AsyncSession):
         new_feeds = FeedsEntity(
@@ -16,10 +28,38 @@ class FeedsService:
         )
         session.add(new_feeds)
         await session.commit()
+        self.page_cache.clear()
         return new_feeds.id
 
     @async_db_request_handler
-    async def get_feeds(self, session: AsyncSession):
-        query = select(FeedsEntity)
+    async def add_feeds_bulk(self, feeds: List[Feeds], session: AsyncSession):
+        rows = [feed.dict() for feed in feeds]
+        ids = []
+        for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+            query = (
+                insert(FeedsEntity)
+                .values(rows[start:start + BULK_INSERT_CHUNK_SIZE])
+                .on_conflict_do_nothing(index_elements=[FeedsEntity.name])
+                .returning(FeedsEntity.id)
+            )
+            result = await session.execute(query)
+            ids.extend(result.scalars().all())
+        await session.commit()
+        self.page_cache.clear()
+        return ids
+
+    @async_db_request_handler
+    async def get_feeds(self, session: AsyncSession, after_id: int = 0, limit: int = DEFAULT_PAGE_SIZE):
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        key = (after_id, limit)
+        page = self.page_cache.get(key)
+        if page is not None:
+            return page
+
+        query = select(FeedsEntity.id, FeedsEntity.name).where(FeedsEntity.id > after_id).order_by(FeedsEntity.id).limit(limit)
         result = await session.execute(query)
-        return result.scalars().all()
+        page = [{"id": row.id, "name": row.name} for row in result]
+        if len(self.page_cache) >= MAX_CACHED_PAGES:
+            self.page_cache.clear()
+        self.page_cache[key] = page
+        return page
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app is run from src/ with top-level imports, e.g. `from data_feeds.volumes import VolumeStore`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,29 @@
+import app_service
+from app_service import AppService
+from utils.voting_round_utils import voting_round_start_ms
+
+
+def as_of(monkeypatch, voting_round_id, anchor="end", offset_ms=0, now_ms=None):
+    monkeypatch.setattr(app_service, "VALUES_AS_OF_ROUND", True)
+    monkeypatch.setattr(app_service, "VALUES_AS_OF_ANCHOR", anchor)
+    monkeypatch.setattr(app_service, "VALUES_AS_OF_OFFSET_MS", offset_ms)
+    if now_ms is not None:
+        monkeypatch.setattr(app_service.time, "time", lambda: now_ms / 1000)
+    return AppService(None, None)._as_of(voting_round_id)
+
+
+def test_as_of_defaults_to_round_end(monkeypatch):
+    assert as_of(monkeypatch, 100) == voting_round_start_ms(101)
+
+
+def test_as_of_round_start_with_offset(monkeypatch):
+    assert as_of(monkeypatch, 100, anchor="start", offset_ms=-2_000) == voting_round_start_ms(100) - 2_000
+
+
+def test_rounds_not_ended_yet_use_latest_values(monkeypatch):
+    assert as_of(monkeypatch, 100, now_ms=voting_round_start_ms(101) - 1) is None
+
+
+def test_as_of_disabled(monkeypatch):
+    monkeypatch.setattr(app_service, "VALUES_AS_OF_ROUND", False)
+    assert AppService(None, None)._as_of(100) is None
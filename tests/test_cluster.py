@@ -0,0 +1,173 @@
+import asyncio
+from typing import Dict
+
+import pytest
+
+from data_feeds.ccxt_provider_service import FeedConfig
+from data_feeds.cluster import (
+    HEARTBEAT,
+    HELLO,
+    PRICE,
+    PRICE_PAYLOAD,
+    SOURCE,
+    TRADES,
+    U32,
+    VOLUMES,
+    VOLUMES_HEADER,
+    ClusterPublisher,
+    FrameApplier,
+    FrameDecoder,
+    decode_frame,
+    encode_frame,
+    read_frames,
+)
+from data_feeds.feed_index import FeedIndex
+from data_feeds.volumes import HISTORY_SEC, VolumeStore
+from dto.provider_requests import FeedId
+
+USDT = FeedId(category=1, name="USDT/USD")
+SOURCES = [("kraken", "BTC/USD"), ("binance", "BTC/USDT"), ("kraken", "USDT/USD")]
+
+
+class Feed:
+    """The parts of CcxtFeed used by ClusterPublisher and FrameApplier."""
+
+    def __init__(self):
+        config = [
+            FeedConfig(feed=FeedId(category=1, name="BTC/USD"), sources=[{"exchange": e, "symbol": s} for e, s in SOURCES[:2]]),
+            FeedConfig(feed=USDT, sources=[{"exchange": "kraken", "symbol": "USDT/USD"}]),
+        ]
+        self.index = FeedIndex(config, USDT, 0.0)
+        self.volumes: Dict[str, Dict[str, VolumeStore]] = {}
+
+    def _set_price(self, exchange: str, symbol: str, price: float, timestamp: int):
+        self.index.set_price(exchange, symbol, price, timestamp)
+
+    def _volume_store(self, exchange: str, symbol: str) -> VolumeStore:
+        return self.volumes.setdefault(symbol, {}).setdefault(exchange, VolumeStore())
+
+
+class Subscriber:
+    """Makes the publisher buffer deltas, which are then read from `publisher.buffer`."""
+
+    transport = None
+
+    def is_closing(self):
+        return False
+
+
+def apply_all(applier: FrameApplier, data: bytes):
+    for body in FrameDecoder().feed(data):
+        applier.apply(body)
+
+
+def assert_same_state(collector: Feed, replica: Feed):
+    assert list(replica.index.prices) == list(collector.index.prices)
+    assert list(replica.index.times) == list(collector.index.times)
+    for symbol, stores in collector.volumes.items():
+        for exchange, store in stores.items():
+            copy = replica.volumes[symbol][exchange]
+            assert copy.last_ts == store.last_ts
+            assert copy.volume_sec == store.volume_sec
+            assert copy.rolling_volume(store.last_ts) == pytest.approx(store.rolling_volume(store.last_ts))
+
+
+@pytest.mark.parametrize(
+    "kind, payload, expected",
+    [
+        (HELLO, U32.pack(7), 7),
+        (SOURCE, U32.pack(3) + b"kraken\0BTC/USD", (3, "kraken", "BTC/USD")),
+        (PRICE, PRICE_PAYLOAD.pack(3, 1.5, 1_000), (3, 1.5, 1_000)),
+        (HEARTBEAT, b"", None),
+    ],
+)
+def test_frame_round_trip(kind, payload, expected):
+    (body,) = FrameDecoder().feed(encode_frame(kind, payload))
+    assert decode_frame(body) == (kind, expected)
+
+
+def test_decoder_keeps_incomplete_frames():
+    data = encode_frame(PRICE, PRICE_PAYLOAD.pack(1, 2.0, 3)) + encode_frame(HEARTBEAT) + encode_frame(HELLO, U32.pack(9))
+    for chunk_size in (1, 3, 7, len(data)):
+        decoder = FrameDecoder()
+        bodies = []
+        for i in range(0, len(data), chunk_size):
+            bodies += decoder.feed(data[i:i + chunk_size])
+        assert [decode_frame(body)[0] for body in bodies] == [PRICE, HEARTBEAT, HELLO]
+        assert not decoder.buffer
+
+
+def test_read_frames_from_stream():
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(encode_frame(HEARTBEAT) + encode_frame(HELLO, U32.pack(1))[:3])
+        decoder = FrameDecoder()
+        first = await read_frames(reader, decoder, 1)
+        reader.feed_data(encode_frame(HELLO, U32.pack(1))[3:])
+        reader.feed_eof()
+        second = await read_frames(reader, decoder, 1)
+        with pytest.raises(asyncio.IncompleteReadError):
+            await read_frames(reader, decoder, 1)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert [decode_frame(body) for body in first] == [(HEARTBEAT, None)]
+    assert [decode_frame(body) for body in second] == [(HELLO, 1)]
+
+
+def test_snapshot_recreates_prices_and_volumes():
+    collector = Feed()
+    collector._set_price("kraken", "BTC/USD", 60_000.0, 1_000_000)
+    collector._set_price("kraken", "USDT/USD", 1.001, 1_000_500)
+    collector._volume_store("kraken", "BTC/USD").process_lean_trades([(1_000_000 + i * 700, 60_000.0, 0.1, i) for i in range(50)])
+
+    replica = Feed()
+    apply_all(FrameApplier(replica), ClusterPublisher(None, collector).snapshot())
+    assert_same_state(collector, replica)
+    assert replica.index.times[replica.index.slot_by_source[("binance", "BTC/USDT")]] == 0
+
+
+def test_deltas_after_snapshot_keep_replica_in_sync():
+    collector = Feed()
+    publisher = ClusterPublisher(None, collector)
+    collector._set_price("kraken", "BTC/USD", 60_000.0, 1_000_000)
+    replica = Feed()
+    applier = FrameApplier(replica)
+    apply_all(applier, publisher.snapshot())
+
+    publisher.subscribers.append(Subscriber())
+    trades = [(1_001_000 + i * 300, 60_000.0 + i, 0.01 * i) for i in range(20)]
+    for exchange, symbol in SOURCES[:2]:
+        collector._set_price(exchange, symbol, trades[-1][1], trades[-1][0])
+        publisher.price(exchange, symbol, trades[-1][1], trades[-1][0])
+        collector._volume_store(exchange, symbol).process_lean_trades([(*t, i) for i, t in enumerate(trades)])
+        publisher.trades(exchange, symbol, trades)
+    deltas = bytes(publisher.buffer)
+
+    apply_all(applier, deltas)
+    assert_same_state(collector, replica)
+    # Trades replayed within the same collector epoch are not counted twice
+    apply_all(applier, deltas)
+    assert_same_state(collector, replica)
+
+
+def test_volumes_frame_carries_whole_history():
+    store = VolumeStore()
+    store.process_lean_trades([(5_000_000, 2.0, 3.0, 1)])
+    payload = VOLUMES_HEADER.pack(4, store.last_ts) + store.volume_sec.tobytes()
+    (body,) = FrameDecoder().feed(encode_frame(VOLUMES, payload))
+    kind, (source_id, last_ts, volume_sec) = decode_frame(body)
+    assert (kind, source_id, last_ts) == (VOLUMES, 4, 5_000_000)
+    assert volume_sec == store.volume_sec
+    assert volume_sec[5_000 % HISTORY_SEC] == 6.0
+
+
+def test_trades_frame_round_trip():
+    collector = Feed()
+    publisher = ClusterPublisher(None, collector)
+    publisher.subscribers.append(Subscriber())
+    publisher.trades("kraken", "BTC/USD", [(1_000, 1.5, 2.0), (1_001, 1.6, 0.5)])
+    source, trades = FrameDecoder().feed(bytes(publisher.buffer))
+    assert decode_frame(source) == (SOURCE, (0, "kraken", "BTC/USD"))
+    assert decode_frame(trades) == (TRADES, (0, [(1_000, 1.5, 2.0, 0), (1_001, 1.6, 0.5, 1)]))
+
@@ -0,0 +1,46 @@
+from data_feeds.ccxt_provider_service import CcxtFeed, FeedConfig
+from data_feeds.price_history import PriceHistory
+from dto.provider_requests import FeedId
+
+BTC = FeedId(category=1, name="BTC/USD")
+SOURCES = [("kraken", "BTC/USD"), ("coinbase", "BTC/USD"), ("bitstamp", "BTC/USD")]
+NOW = 1_700_000_000_000
+
+
+def make_feed(history_size: int) -> CcxtFeed:
+    feed = CcxtFeed()
+    feed._apply_config([FeedConfig(feed=BTC, sources=[{"exchange": e, "symbol": s} for e, s in SOURCES])])
+    feed.index.history = PriceHistory(len(SOURCES), size=history_size, resolution_ms=100)
+    return feed
+
+
+def trade_busy_sources(feed: CcxtFeed, start: int, end: int, prices=(100.0, 100.1)):
+    for t in range(start, end + 1, 100):
+        feed._set_price("kraken", "BTC/USD", prices[0], t)
+        feed._set_price("coinbase", "BTC/USD", prices[1], t)
+
+
+def test_feed_falls_back_to_latest_when_busy_sources_evicted_as_of():
+    # The busy sources keep 60 s of history, the quiet source last traded 120 s ago
+    feed = make_feed(history_size=600)
+    feed._set_price("bitstamp", "BTC/USD", 50.0, NOW - 120_000)
+    trade_busy_sources(feed, NOW - 119_900, NOW)
+    as_of = NOW - 90_000
+    assert not feed.index.history.reaches(0, as_of)
+    assert feed.index.history.price_at(2, as_of) == (50.0, NOW - 120_000)
+
+    latest = feed._get_feed_prices([BTC])[0]
+    assert feed._get_feed_prices([BTC], as_of)[0] == latest
+    assert {s.exchange: s.time for s in feed.get_source_prices([BTC], as_of)[0]}["kraken"] == NOW
+
+
+def test_feed_is_served_from_history_when_every_source_reaches_as_of():
+    feed = make_feed(history_size=2_000)
+    feed._set_price("bitstamp", "BTC/USD", 99.0, NOW - 120_000)
+    trade_busy_sources(feed, NOW - 119_900, NOW - 60_000, prices=(90.0, 90.1))
+    trade_busy_sources(feed, NOW - 59_900, NOW)
+    as_of = NOW - 90_000
+
+    assert feed._get_feed_prices([BTC], as_of)[0] == 90.1
+    sources = feed.get_source_prices([BTC], as_of)[0]
+    assert sorted((s.exchange, s.value) for s in sources) == [("bitstamp", 99.0), ("coinbase", 90.1), ("kraken", 90.0)]
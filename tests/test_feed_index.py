@@ -0,0 +1,80 @@
+from data_feeds.ccxt_provider_service import FeedConfig
+from data_feeds.feed_index import FeedIndex
+from dto.provider_requests import FeedId
+
+USDT = FeedId(category=1, name="USDT/USD")
+BTC = FeedId(category=1, name="BTC/USD")
+ETH = FeedId(category=1, name="ETH/USD")
+
+
+def feed_config(feed: FeedId, *sources):
+    return FeedConfig(feed=feed, sources=[{"exchange": exchange, "symbol": symbol} for exchange, symbol in sources])
+
+
+def make_index() -> FeedIndex:
+    config = [
+        feed_config(USDT, ("kraken", "USDT/USD")),
+        feed_config(BTC, ("kraken", "BTC/USD"), ("binance", "BTC/USDT")),
+        feed_config(ETH, ("kraken", "ETH/USD"), ("coinbase", "ETH/USD")),
+    ]
+    index = FeedIndex(config, USDT, 0.0)
+    for fid in range(len(config)):
+        assert index.take_stale(fid, 1_000, 60_000)
+    return index
+
+
+def test_sources_shared_between_feeds_get_one_slot():
+    config = [feed_config(BTC, ("kraken", "BTC/USD")), feed_config(ETH, ("kraken", "BTC/USD"), ("kraken", "ETH/USD"))]
+    index = FeedIndex(config, USDT, 0.0)
+    assert index.feed_slots == [(0,), (0, 1)]
+    assert index.slot_feeds == [(0, 1), (1,)]
+
+
+def test_all_feeds_start_dirty():
+    index = FeedIndex([feed_config(BTC, ("kraken", "BTC/USD"))], USDT, 0.0)
+    assert index.dirty == {0}
+
+
+def test_price_update_marks_dependent_feeds_dirty():
+    index = make_index()
+    assert index.set_price("coinbase", "ETH/USD", 3_000.0, 2_000)
+    assert index.dirty == {index.feed_id(ETH)}
+
+
+def test_usdt_price_update_marks_usdt_quoted_feeds_dirty():
+    index = make_index()
+    index.set_price("kraken", "USDT/USD", 1.0, 2_000)
+    assert index.dirty == {index.feed_id(USDT), index.feed_id(BTC)}
+
+
+def test_unknown_source_is_ignored():
+    index = make_index()
+    assert not index.set_price("kraken", "XRP/USD", 1.0, 2_000)
+    assert index.dirty == set()
+
+
+def test_take_stale_clears_dirty_feed_once():
+    index = make_index()
+    fid = index.feed_id(BTC)
+    assert not index.take_stale(fid, 2_000, 60_000)
+    index.set_price("kraken", "BTC/USD", 60_000.0, 2_000)
+    assert index.take_stale(fid, 2_000, 60_000)
+    assert not index.take_stale(fid, 2_000, 60_000)
+
+
+def test_take_stale_expires_old_values():
+    index = make_index()
+    fid = index.feed_id(BTC)
+    assert not index.take_stale(fid, 61_000, 60_000)
+    assert index.take_stale(fid, 61_001, 60_000)
+    assert index.value_times[fid] == 61_001
+
+
+def test_copy_prices_from_keeps_prices_of_remaining_sources():
+    old = make_index()
+    old.set_price("kraken", "BTC/USD", 60_000.0, 2_000)
+    old.set_price("coinbase", "ETH/USD", 3_000.0, 2_000)
+    new = FeedIndex([feed_config(BTC, ("kraken", "BTC/USD"))], USDT, 0.0)
+    new.copy_prices_from(old)
+    assert (new.prices[0], new.times[0]) == (60_000.0, 2_000)
+    assert new.history.price_at(0, 2_000) == (60_000.0, 2_000)
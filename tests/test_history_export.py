@@ -0,0 +1,130 @@
+import asyncio
+import struct
+from array import array
+
+import pytest
+
+from data_feeds.base_feed import PriceSeries, VolumeHistory
+from data_feeds.history_export import (
+    ARROW_EOS,
+    PRICE_HEADER,
+    RECORD_HEADER,
+    VOLUME_HEADER,
+    check_format,
+    pa,
+    stream_prices,
+    stream_volumes,
+)
+
+
+def collect(chunks) -> list:
+    async def run():
+        return [bytes(chunk) async for chunk in chunks]
+
+    return asyncio.run(run())
+
+
+def read_record(data: bytes, offset: int):
+    kind, exchange_len, symbol_len = RECORD_HEADER.unpack_from(data, offset)
+    offset += RECORD_HEADER.size
+    exchange = data[offset:offset + exchange_len].decode()
+    offset += exchange_len
+    symbol = data[offset:offset + symbol_len].decode()
+    return kind, exchange, symbol, offset + symbol_len
+
+
+def split(values: array, at: int):
+    view = memoryview(values)
+    return view[:at], view[at:]
+
+
+def test_binary_volumes_are_one_record_per_source():
+    volumes = array("d", [1.0, 2.0, 3.0, 4.0])
+    histories = [VolumeHistory("kraken", "BTC/USD", 100, split(volumes, 1)), VolumeHistory("binance", "BTC/USDT", 200, (memoryview(volumes),))]
+    chunks = collect(stream_volumes(iter(histories), "binary"))
+    assert len(chunks) == 2
+
+    for chunk, history in zip(chunks, histories):
+        kind, exchange, symbol, offset = read_record(chunk, 0)
+        start_sec, count = VOLUME_HEADER.unpack_from(chunk, offset)
+        offset += VOLUME_HEADER.size
+        assert (kind, exchange, symbol, start_sec) == (b"V", history.exchange, history.symbol, history.start_sec)
+        assert struct.unpack_from(f"<{count}d", chunk, offset) == (1.0, 2.0, 3.0, 4.0)
+        assert offset + count * 8 == len(chunk)
+
+
+def test_binary_record_is_not_affected_by_later_buffer_changes():
+    volumes = array("d", [1.0, 2.0])
+    chunks = stream_volumes(iter([VolumeHistory("kraken", "BTC/USD", 0, (memoryview(volumes),))]), "binary")
+
+    async def run():
+        chunk = await chunks.__anext__()
+        volumes[0] = 99.0
+        return chunk
+
+    chunk = asyncio.run(run())
+    assert struct.unpack_from("<2d", chunk, len(chunk) - 16) == (1.0, 2.0)
+
+
+def test_binary_prices_store_times_then_prices():
+    times, prices = array("q", [10, 20, 30]), array("d", [1.5, 2.5, 3.5])
+    series = PriceSeries("kraken", "BTC/USD", split(times, 2), split(prices, 2))
+    (chunk,) = collect(stream_prices(iter([series]), "binary"))
+    kind, exchange, symbol, offset = read_record(chunk, 0)
+    (count,) = PRICE_HEADER.unpack_from(chunk, offset)
+    offset += PRICE_HEADER.size
+    assert (kind, exchange, symbol, count) == (b"P", "kraken", "BTC/USD", 3)
+    assert struct.unpack_from("<3q", chunk, offset) == (10, 20, 30)
+    assert struct.unpack_from("<3d", chunk, offset + 24) == (1.5, 2.5, 3.5)
+    assert offset + 48 == len(chunk)
+
+
+def test_empty_binary_export():
+    assert collect(stream_volumes(iter(()), "binary")) == []
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        check_format("csv")
+
+
+@pytest.mark.skipif(pa is None, reason="pyarrow is not installed")
+def test_arrow_volumes_stream():
+    import pyarrow.ipc as ipc
+
+    volumes = array("d", [1.0, 2.0, 3.0])
+    histories = [VolumeHistory("kraken", "BTC/USD", 100, split(volumes, 2))]
+    chunks = collect(stream_volumes(iter(histories), "arrow"))
+    assert chunks[-1] == ARROW_EOS
+    table = ipc.open_stream(b"".join(chunks)).read_all()
+    assert table.column_names == ["exchange", "symbol", "time", "volume"]
+    assert table.column("volume").to_pylist() == [1.0, 2.0, 3.0]
+    assert [t.timestamp() for t in table.column("time").to_pylist()] == [100, 101, 102]
+    assert set(table.column("exchange").to_pylist()) == {"kraken"}
+
+
+@pytest.mark.skipif(pa is None, reason="pyarrow is not installed")
+def test_arrow_prices_stream():
+    import pyarrow.ipc as ipc
+
+    times, prices = array("q", [10, 20]), array("d", [1.5, 2.5])
+    series = [PriceSeries("kraken", "BTC/USD", (memoryview(times),), (memoryview(prices),))]
+    table = ipc.open_stream(b"".join(collect(stream_prices(iter(series), "arrow")))).read_all()
+    assert table.column("price").to_pylist() == [1.5, 2.5]
+    assert table.column("time").cast("int64").to_pylist() == [10, 20]
+
+
+@pytest.mark.skipif(pa is None, reason="pyarrow is not installed")
+def test_arrow_batches_of_a_source_are_copied_together():
+    import pyarrow.ipc as ipc
+
+    volumes = array("d", [1.0, 2.0, 3.0])
+    chunks = stream_volumes(iter([VolumeHistory("kraken", "BTC/USD", 100, split(volumes, 1))]), "arrow")
+
+    async def run():
+        received = [bytes(await chunks.__anext__()), bytes(await chunks.__anext__())]
+        volumes[2] = 99.0
+        return received + [bytes(chunk) async for chunk in chunks]
+
+    table = ipc.open_stream(b"".join(asyncio.run(run()))).read_all()
+    assert table.column("volume").to_pylist() == [1.0, 2.0, 3.0]
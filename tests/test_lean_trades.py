@@ -0,0 +1,55 @@
+from data_feeds.lean_trades import BinanceAdapter, BybitAdapter, OkxAdapter
+
+
+def test_binance_parses_trade_stream_message():
+    message = {
+        "stream": "btcusdt@trade",
+        "data": {"e": "trade", "s": "BTCUSDT", "t": 12345, "p": "60000.10", "q": "0.002", "T": 1700000000123},
+    }
+    assert list(BinanceAdapter().parse(message)) == [("BTCUSDT", [(1700000000123, 60000.1, 0.002, 12345)])]
+
+
+def test_binance_ignores_other_messages():
+    assert list(BinanceAdapter().parse({"result": None, "id": 1})) == []
+    assert list(BinanceAdapter().parse({"data": {"e": "aggTrade"}})) == []
+
+
+def test_binance_url_lists_streams():
+    assert BinanceAdapter().url(["BTCUSDT", "ETHUSDT"]).endswith("streams=btcusdt@trade/ethusdt@trade")
+
+
+def test_bybit_parses_public_trades():
+    message = {
+        "topic": "publicTrade.BTCUSDT",
+        "type": "snapshot",
+        "data": [
+            {"T": 1700000000100, "s": "BTCUSDT", "S": "Buy", "v": "0.5", "p": "60000", "i": "a1"},
+            {"T": 1700000000200, "s": "BTCUSDT", "S": "Sell", "v": "0.25", "p": "60001.5", "i": "a2"},
+        ],
+    }
+    assert list(BybitAdapter().parse(message)) == [
+        ("BTCUSDT", [(1700000000100, 60000.0, 0.5, "a1"), (1700000000200, 60001.5, 0.25, "a2")])
+    ]
+
+
+def test_bybit_ignores_other_messages():
+    assert list(BybitAdapter().parse({"op": "pong", "success": True})) == []
+    assert list(BybitAdapter().parse({"topic": "orderbook.1.BTCUSDT", "data": []})) == []
+
+
+def test_bybit_splits_subscriptions():
+    subscriptions = BybitAdapter().subscriptions([f"M{i}" for i in range(25)])
+    assert [len(s["args"]) for s in subscriptions] == [10, 10, 5]
+    assert subscriptions[0]["args"][0] == "publicTrade.M0"
+
+
+def test_okx_parses_trades():
+    message = {
+        "arg": {"channel": "trades", "instId": "BTC-USDT"},
+        "data": [{"instId": "BTC-USDT", "tradeId": "130639474", "px": "42219.9", "sz": "0.12", "side": "buy", "ts": "1630048897897"}],
+    }
+    assert list(OkxAdapter().parse(message)) == [("BTC-USDT", [(1630048897897, 42219.9, 0.12, "130639474")])]
+
+
+def test_okx_ignores_subscription_events():
+    assert list(OkxAdapter().parse({"event": "subscribe", "arg": {"channel": "trades", "instId": "BTC-USDT"}})) == []
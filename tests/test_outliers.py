@@ -0,0 +1,50 @@
+import pytest
+
+from data_feeds.outliers import filter_outliers, median, select_kth
+
+
+@pytest.mark.parametrize("values", [[3.0], [5.0, 1.0, 4.0], [2.0, 2.0, 1.0, 3.0, 2.0], [9.0, -1.0, 4.5, 0.0, 7.0, 3.0]])
+def test_select_kth_matches_sorted(values):
+    for k in range(len(values)):
+        assert select_kth(list(values), k) == sorted(values)[k]
+
+
+def test_median_of_even_count_averages_middle_values():
+    assert median([4.0, 1.0, 3.0, 2.0]) == 2.5
+
+
+def test_median_of_empty_list_raises():
+    with pytest.raises(ValueError):
+        median([])
+
+
+def test_mad_rejects_far_source():
+    assert filter_outliers([100.0, 100.5, 99.5, 100.2, 150.0], float, "mad") == [100.0, 100.5, 99.5, 100.2]
+
+
+def test_mad_rejects_broken_source_when_others_agree_exactly():
+    # MAD is 0 here, without a floor every price would be kept
+    assert filter_outliers([100.0, 100.0, 100.0, 100.0, 1.0], float, "mad") == [100.0] * 4
+
+
+def test_mad_keeps_small_deviation_when_others_agree_exactly():
+    assert filter_outliers([100.0, 100.0, 100.0, 100.01], float, "mad") == [100.0, 100.0, 100.0, 100.01]
+
+
+def test_percent_rejects_sources_outside_deviation():
+    assert filter_outliers([100.0, 101.0, 99.0, 110.0], float, "percent") == [100.0, 101.0, 99.0]
+
+
+def test_too_few_sources_are_not_filtered():
+    assert filter_outliers([100.0, 1.0], float, "mad") == [100.0, 1.0]
+
+
+def test_none_and_unknown_modes_keep_all():
+    items = [100.0, 100.0, 1.0]
+    assert filter_outliers(items, float, "none") == items
+    assert filter_outliers(items, float, "bogus") == items
+
+
+def test_filters_by_value_of_item():
+    items = [("a", 10.0), ("b", 10.1), ("c", 9.9), ("d", 20.0)]
+    assert [name for name, _ in filter_outliers(items, lambda item: item[1], "percent")] == ["a", "b", "c"]
@@ -0,0 +1,87 @@
+from data_feeds.price_history import PriceHistory
+from utils.voting_round_utils import VALUES_AS_OF_OFFSET_MS, VOTING_EPOCH_DURATION_SEC
+
+
+def points(history: PriceHistory, slot: int):
+    times, prices = history.series(slot)
+    return [(t, p) for view_t, view_p in zip(times, prices) for t, p in zip(view_t, view_p)]
+
+
+def test_price_at_returns_last_point_at_or_before_time():
+    history = PriceHistory(1, size=10, resolution_ms=1)
+    for t in (100, 200, 300):
+        history.append(0, t, t / 100)
+    assert history.price_at(0, 99) is None
+    assert history.price_at(0, 100) == (1.0, 100)
+    assert history.price_at(0, 250) == (2.0, 200)
+    assert history.price_at(0, 10_000) == (3.0, 300)
+
+
+def test_price_at_without_points():
+    assert PriceHistory(2, size=4).price_at(1, 1_000) is None
+
+
+def test_points_in_same_bucket_replace_each_other():
+    history = PriceHistory(1, size=10, resolution_ms=100)
+    history.append(0, 1_000, 1.0)
+    history.append(0, 1_050, 2.0)
+    history.append(0, 1_100, 3.0)
+    assert points(history, 0) == [(1_050, 2.0), (1_100, 3.0)]
+
+
+def test_out_of_order_points_are_ignored():
+    history = PriceHistory(1, size=10, resolution_ms=1)
+    history.append(0, 200, 2.0)
+    history.append(0, 100, 1.0)
+    assert points(history, 0) == [(200, 2.0)]
+
+
+def test_ring_keeps_latest_points_in_order():
+    history = PriceHistory(1, size=4, resolution_ms=1)
+    for t in range(1, 8):
+        history.append(0, t * 10, float(t))
+    times, _ = history.series(0)
+    assert len(times) == 2
+    assert points(history, 0) == [(40, 4.0), (50, 5.0), (60, 6.0), (70, 7.0)]
+    assert history.price_at(0, 35) is None
+    assert history.price_at(0, 55) == (5.0, 50)
+
+
+def test_slots_are_independent():
+    history = PriceHistory(3, size=4, resolution_ms=1)
+    history.append(1, 100, 1.0)
+    history.append(2, 100, 2.0)
+    assert points(history, 0) == []
+    assert points(history, 1) == [(100, 1.0)]
+    assert points(history, 2) == [(100, 2.0)]
+
+
+def test_copy_slot_carries_history_over():
+    old = PriceHistory(2, size=4, resolution_ms=1)
+    for t in range(1, 6):
+        old.append(1, t, float(t))
+    new = PriceHistory(1, size=4, resolution_ms=1)
+    new.copy_slot(old, 1, 0)
+    assert points(new, 0) == points(old, 1)
+    new.append(0, 6, 6.0)
+    assert points(new, 0) == [(3, 3.0), (4, 4.0), (5, 5.0), (6, 6.0)]
+
+
+def test_reaches_until_older_points_are_evicted():
+    history = PriceHistory(2, size=3, resolution_ms=1)
+    assert history.reaches(0, 0)
+    for t in (10, 20, 30):
+        history.append(0, t, 1.0)
+    assert history.reaches(0, 5)
+    history.append(0, 40, 1.0)
+    assert not history.reaches(0, 15)
+    assert history.reaches(0, 20)
+    assert history.reaches(1, 5)
+
+
+def test_default_history_covers_a_voting_epoch_on_busy_sources():
+    history = PriceHistory(1)
+    now = 1_700_000_000_000
+    for t in range(now - 200_000, now + 1, 10):
+        history.append(0, t, 1.0)
+    assert history.reaches(0, now - VOTING_EPOCH_DURATION_SEC * 1000 - abs(VALUES_AS_OF_OFFSET_MS))
@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+from data_feeds import ccxt_provider_service
+from data_feeds.ccxt_provider_service import CcxtFeed, FeedConfig
+from data_feeds.replica_feed import ReplicaFeed
+from data_feeds.synthetic_feed import SyntheticFeed
+from dto.provider_requests import FeedId
+
+BTC = FeedId(category=1, name="BTC/USD")
+
+
+def configure(feed: CcxtFeed) -> CcxtFeed:
+    feed._apply_config([FeedConfig(feed=BTC, sources=[{"exchange": "kraken", "symbol": "BTC/USD"}])])
+    return feed
+
+
+def use_snapshot(monkeypatch, path, interval_ms=10):
+    monkeypatch.setattr(ccxt_provider_service, "STATE_SNAPSHOT_PATH", str(path))
+    monkeypatch.setattr(ccxt_provider_service, "STATE_SNAPSHOT_INTERVAL_MS", interval_ms)
+
+
+def test_snapshot_is_saved_periodically_and_restored(monkeypatch, tmp_path):
+    path = tmp_path / "snapshot.bin"
+    use_snapshot(monkeypatch, path)
+    now = int(time.time() * 1000)
+    collector = configure(CcxtFeed())
+    collector._set_price("kraken", "BTC/USD", 60_000.0, now)
+    collector._volume_store("kraken", "BTC/USD").process_lean_trades([(now, 60_000.0, 0.5, 1)])
+
+    async def run():
+        collector._start_state_snapshots()
+        await asyncio.sleep(0.1)
+        await collector.tasks.cancel_all(1)
+
+    asyncio.run(run())
+    assert path.exists()
+
+    restored = configure(CcxtFeed())
+    restored._restore_state()
+    assert restored.index.prices[0] == 60_000.0
+    store = restored.volumes["BTC/USD"]["kraken"]
+    assert store.last_ts == now
+    assert store.process_lean_trades([(now, 60_000.0, 0.5, 2)]) == []
+
+
+def test_synthetic_and_following_replica_feeds_do_not_save(monkeypatch, tmp_path):
+    path = tmp_path / "snapshot.bin"
+    use_snapshot(monkeypatch, path)
+    for feed in (SyntheticFeed(), ReplicaFeed()):
+        configure(feed)._save_state()
+    assert not path.exists()
+
+    replica = configure(ReplicaFeed())
+    replica.promoted = True
+    replica._save_state()
+    assert path.exists()
@@ -0,0 +1,49 @@
+import pytest
+
+from data_feeds import synthetic_feed
+from data_feeds.synthetic_feed import SYNTHETIC_TICK_MS, SyntheticFeed
+
+NOW = 1_700_000_000_000
+
+
+def make_feed(monkeypatch, use_numpy: bool) -> SyntheticFeed:
+    if not use_numpy:
+        monkeypatch.setattr(synthetic_feed, "np", None)
+    elif synthetic_feed.np is None:
+        pytest.skip("numpy is not installed")
+    monkeypatch.setattr(synthetic_feed, "SYNTHETIC_FEEDS", 50)
+    feed = SyntheticFeed()
+    feed.config = feed._read_config()
+    feed._apply_config(feed.config)
+    feed._init_simulation()
+    return feed
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_tick_dispatches_time_ordered_trades_per_source(monkeypatch, use_numpy):
+    feed = make_feed(monkeypatch, use_numpy)
+    received = []
+    feed._on_lean_trades = lambda exchange, symbol, trades: received.append((exchange, symbol, trades))
+    for i in range(10):
+        feed._tick(NOW + i * SYNTHETIC_TICK_MS)
+
+    assert received
+    sources = {(exchange, symbol) for exchange, symbol, _, _ in feed.source_list}
+    ids = []
+    for exchange, symbol, trades in received:
+        assert (exchange, symbol) in sources
+        timestamps = [t[0] for t in trades]
+        assert timestamps == sorted(timestamps)
+        assert all(NOW - SYNTHETIC_TICK_MS <= t < NOW + 9 * SYNTHETIC_TICK_MS for t in timestamps)
+        assert all(isinstance(price, float) and price > 0 and amount > 0 for _, price, amount, _ in trades)
+        ids += [t[3] for t in trades]
+    assert len(ids) == len(set(ids)) == feed.next_trade_id
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_ticks_drive_prices_and_volumes(monkeypatch, use_numpy):
+    feed = make_feed(monkeypatch, use_numpy)
+    for i in range(20):
+        feed._tick(NOW + i * SYNTHETIC_TICK_MS)
+    assert sum(1 for t in feed.index.times if t) > len(feed.source_list) // 2
+    assert any(store.last_ts for stores in feed.volumes.values() for store in stores.values())
@@ -0,0 +1,39 @@
+from data_feeds.trade_dedup import TradeDedup
+
+
+def test_repeated_id_is_seen():
+    dedup = TradeDedup(size=10)
+    assert not dedup.seen("a")
+    assert dedup.seen("a")
+    assert not dedup.seen("b")
+
+
+def test_ids_of_previous_generation_are_still_seen():
+    dedup = TradeDedup(size=3)
+    for i in range(3):
+        assert not dedup.seen(i)
+    assert dedup.current == set()
+    assert not dedup.seen(3)
+    assert all(dedup.seen(i) for i in range(4))
+
+
+def test_ids_older_than_two_generations_are_forgotten():
+    dedup = TradeDedup(size=2)
+    for i in range(6):
+        dedup.seen(i)
+    assert not dedup.seen(0)
+    assert dedup.seen(5)
+
+
+def test_memory_stays_bounded():
+    dedup = TradeDedup(size=100)
+    for i in range(10_000):
+        dedup.seen(i)
+    assert len(dedup.current) + len(dedup.previous) <= 200
+
+
+def test_tuple_keys_without_trade_id():
+    dedup = TradeDedup(size=10)
+    assert not dedup.seen((1_000, 1.5, 2.0))
+    assert dedup.seen((1_000, 1.5, 2.0))
+    assert not dedup.seen((1_000, 1.5, 3.0))
@@ -0,0 +1,114 @@
+import random
+
+import pytest
+
+from data_feeds.volumes import HISTORY_SEC, VolumeStore
+
+
+def trade(timestamp: int, price: float, amount: float, trade_id=None):
+    return {"timestamp": timestamp, "price": price, "amount": amount, "id": trade_id}
+
+
+def window_sum(store: VolumeStore, now_ms: int) -> float:
+    """Volume of the seconds in the rolling window ending at `now_ms`, summed from the buckets."""
+    now_sec, last_sec = now_ms // 1000, store.last_ts // 1000
+    return sum(
+        store.volume_sec[t % HISTORY_SEC]
+        for t in range(now_sec - store.rolling_window_sec + 1, last_sec + 1)
+        if t > last_sec - HISTORY_SEC
+    )
+
+
+def test_volume_is_price_times_amount():
+    store = VolumeStore(rolling_window_sec=60)
+    store.process_trades([trade(1_000_500, 2.0, 3.0, 1), trade(1_000_700, 4.0, 0.5, 2)])
+    assert store.volume_sec[1_000 % HISTORY_SEC] == 8.0
+    assert store.rolling_volume(1_000_900) == 8.0
+
+
+def test_duplicate_trades_are_counted_once():
+    store = VolumeStore(rolling_window_sec=60)
+    assert len(store.process_trades([trade(1_000_000, 1.0, 1.0, "a"), trade(1_000_000, 1.0, 1.0, "a")])) == 1
+    assert store.process_trades([trade(1_000_000, 1.0, 1.0, "a")]) == []
+    assert store.rolling_volume(1_000_000) == 1.0
+
+
+def test_rolling_sum_matches_buckets():
+    rng = random.Random(7)
+    store = VolumeStore(rolling_window_sec=30)
+    timestamp = 1_000_000
+    for _ in range(2_000):
+        timestamp += rng.choice((0, 50, 400, 1_000, 7_000))
+        late = timestamp - rng.randint(0, 40_000) if rng.random() < 0.1 else timestamp
+        store.process_lean_trades([(late, rng.uniform(1, 10), rng.uniform(0, 2), None)])
+        now_ms = store.last_ts + rng.randint(0, 40_000)
+        assert store.rolling_volume(now_ms) == pytest.approx(window_sum(store, now_ms), abs=1e-6)
+
+
+def test_rolling_volume_decays_without_trades():
+    store = VolumeStore(rolling_window_sec=10)
+    store.process_lean_trades([(1_000_000, 1.0, 1.0, 1), (1_005_000, 1.0, 2.0, 2)])
+    assert store.rolling_volume(1_005_000) == 3.0
+    assert store.rolling_volume(1_010_000) == 2.0
+    assert store.rolling_volume(1_015_000) == 0
+
+
+def test_late_trade_within_window_is_counted():
+    store = VolumeStore(rolling_window_sec=10)
+    store.process_lean_trades([(1_010_000, 1.0, 1.0, 1), (1_005_000, 1.0, 2.0, 2), (1_000_000, 1.0, 4.0, 3)])
+    assert store.rolling_volume(1_010_000) == 3.0
+    assert store.volume_sec[1_000 % HISTORY_SEC] == 4.0
+
+
+def test_gap_longer_than_history_resets_volumes():
+    store = VolumeStore(rolling_window_sec=10)
+    store.process_lean_trades([(1_000_000, 1.0, 5.0, 1)])
+    store.process_lean_trades([(1_000_000 + HISTORY_SEC * 1000, 1.0, 1.0, 2)])
+    assert sum(store.volume_sec) == 1.0
+    assert store.rolling_volume(store.last_ts) == 1.0
+
+
+def test_restore_recomputes_rolling_sum():
+    source = VolumeStore(rolling_window_sec=10)
+    source.process_lean_trades([(1_000_000 + i * 1_000, 1.0, float(i), i) for i in range(20)])
+    store = VolumeStore(rolling_window_sec=10)
+    store.restore(source.last_ts, source.volume_sec)
+    assert store.rolling_volume(source.last_ts) == source.rolling_volume(source.last_ts)
+
+
+def test_restore_rejects_wrong_history_length():
+    with pytest.raises(ValueError):
+        VolumeStore().restore(1_000_000, [0.0] * 10)
+
+
+def test_history_views_are_oldest_first():
+    store = VolumeStore(rolling_window_sec=10)
+    store.process_lean_trades([(1_000_000, 1.0, 1.0, 1), (1_001_000, 1.0, 2.0, 2)])
+    start_sec, views = store.history()
+    volumes = [v for view in views for v in view]
+    assert start_sec == 1_001 - HISTORY_SEC + 1
+    assert len(volumes) == HISTORY_SEC
+    assert volumes[-2:] == [1.0, 2.0]
+
+
+def test_empty_store():
+    store = VolumeStore()
+    assert store.rolling_volume(1_000_000) == 0
+    assert store.get_volume(60) == 0
+    assert store.history() == (0, ())
+
+
+def test_skip_until_ignores_trades_already_in_restored_history():
+    store = VolumeStore(rolling_window_sec=60)
+    store.restore(1_010_000, [0.0] * HISTORY_SEC)
+    store.skip_until(store.last_ts)
+    assert store.process_trades([trade(1_009_000, 1.0, 1.0, "a"), trade(1_010_000, 1.0, 1.0, "b")]) == []
+    assert store.process_lean_trades([(1_010_000, 1.0, 1.0, "c")]) == []
+    assert len(store.process_lean_trades([(1_010_001, 1.0, 2.0, "d")])) == 1
+    assert store.rolling_volume(1_010_001) == 2.0
+
+
+def test_skip_until_none_counts_everything():
+    store = VolumeStore(rolling_window_sec=60)
+    store.skip_until(None)
+    assert len(store.process_lean_trades([(1, 1.0, 1.0, "a")])) == 1